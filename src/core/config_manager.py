@@ -114,6 +114,7 @@ class ConfigManager:
             },
             "processing_parameters": {
                 "video_conversion": {
+                    "x264_preset": "medium", # Software fallback when no hardware H.264 encoder is available
                     "delete_original_after_processing": False
                 },
                 "audio_enhancement": {
@@ -127,6 +128,8 @@ class ConfigManager:
                 },
                 "image_background_removal": {
                     "image_quality_enhancement": True,
+                    "png_compress_level": 9,
+                    "use_oxipng": False,
                     "delete_original_after_processing": False
                 },
                 "video_enhancement": {
@@ -159,6 +162,8 @@ class ConfigManager:
                     "apply_auto_audio_enhancement": True,
                     "delete_original_after_processing": False,
                     "target_social_media_resolution": "1080x1920",
+                    "x264_preset": "faster",
+                    "use_ram_temp_dir": True, # Keep intermediates in /dev/shm on Linux when it has room
                     "overlays": [] # List to store overlay configurations
                 }
             }
@@ -4,14 +4,68 @@ from pathlib import Path
 import logging
 import numpy as np
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
 import noisereduce as nr
-# Removed unused imports: librosa, soundfile
+import soundfile as sf # Reads/writes WAV/FLAC/OGG in-process; pydub only handles the rest
+from scipy.signal import resample_poly
+from math import gcd
+# Removed unused imports: librosa
 import webrtcvad # For Voice Activity Detection
 
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
 
+# Output formats written directly by libsndfile, with their sample encoding
+SOUNDFILE_SUBTYPES = {"wav": "PCM_16", "flac": "PCM_16", "ogg": "VORBIS"}
+
+SILENCE_FRAME_MS = 10 # Resolution of the silence detection
+
+def _speech_keep_mask(samples: np.ndarray, sample_rate: int, min_silence_len_ms: int,
+                      silence_thresh_db: float, keep_silence_ms: int) -> np.ndarray:
+    """
+    Vectorized equivalent of pydub's split_on_silence at SILENCE_FRAME_MS resolution.
+    A stretch is silence when the RMS over min_silence_len_ms stays below silence_thresh_db
+    (dBFS); everything else is kept, padded by keep_silence_ms on both sides.
+
+    Args:
+        samples (np.ndarray): Mono float samples in [-1.0, 1.0].
+        sample_rate (int): Sample rate of samples.
+        min_silence_len_ms (int): Shortest silence that is removed.
+        silence_thresh_db (float): RMS level below which audio counts as silent.
+        keep_silence_ms (int): Silence kept around each non-silent stretch.
+
+    Returns:
+        np.ndarray: Boolean mask over samples, True for samples to keep.
+    """
+    hop = max(1, sample_rate * SILENCE_FRAME_MS // 1000)
+    frame_count = -(-samples.size // hop)
+    padded = np.zeros(frame_count * hop, dtype=np.float32)
+    padded[:samples.size] = samples
+    frame_energy = np.square(padded).reshape(frame_count, hop).mean(axis=1, dtype=np.float64)
+
+    # Mean energy of every run of window_frames consecutive frames, from one cumulative sum
+    window_frames = max(1, min_silence_len_ms // SILENCE_FRAME_MS)
+    keep_frames = np.ones(frame_count, dtype=bool)
+    if frame_count >= window_frames:
+        cumulative = np.concatenate(([0.0], np.cumsum(frame_energy)))
+        window_energy = (cumulative[window_frames:] - cumulative[:-window_frames]) / window_frames
+        silent_starts = np.flatnonzero(window_energy < 10 ** (silence_thresh_db / 10)) # Energy, so dB/10
+        # Every frame covered by a silent window is silence
+        coverage = np.zeros(frame_count + 1, dtype=np.int32)
+        np.add.at(coverage, silent_starts, 1)
+        np.add.at(coverage, silent_starts + window_frames, -1)
+        keep_frames = np.cumsum(coverage[:-1]) == 0
+
+    # Pad the kept stretches by keep_silence_ms on both sides (a 1-D dilation)
+    pad_frames = keep_silence_ms // SILENCE_FRAME_MS
+    if pad_frames and keep_frames.any() and not keep_frames.all():
+        kept = np.flatnonzero(keep_frames)
+        dilation = np.zeros(frame_count + 1, dtype=np.int32)
+        np.add.at(dilation, np.maximum(kept - pad_frames, 0), 1)
+        np.add.at(dilation, np.minimum(kept + pad_frames + 1, frame_count), -1)
+        keep_frames = np.cumsum(dilation[:-1]) > 0
+
+    return np.repeat(keep_frames, hop)[:samples.size]
+
 class AudioProcessingError(Exception):
     """Custom exception for audio processing errors."""
     pass
@@ -47,6 +101,28 @@ class AudioProcessor:
         self.logger.log(getattr(logging, level.upper()), f"AUDIO_PROGRESS: {message} ({current_step}/{total_steps})")
 
 
+    def _load_audio(self, input_filepath: Path, target_sr: int) -> np.ndarray:
+        """
+        Decodes input_filepath to float32 samples in [-1.0, 1.0] at target_sr, shaped (frames, channels).
+        Formats libsndfile reads (WAV, FLAC, OGG, MP3...) are decoded in-process; anything else
+        (e.g. AAC/M4A) goes through pydub/FFmpeg. Resampling uses a polyphase filter.
+        """
+        try:
+            samples, source_sr = sf.read(str(input_filepath), dtype="float32", always_2d=True)
+        except (sf.LibsndfileError, RuntimeError) as e:
+            self.logger.debug(f"soundfile can't read {input_filepath} ({e}); decoding with pydub.")
+            # Using pydub to load for broad format support
+            audio_segment = AudioSegment.from_file(input_filepath).set_sample_width(2) # 16-bit samples
+            source_sr = audio_segment.frame_rate
+            # View the 16-bit PCM buffer directly; get_array_of_samples() would build an array.array copy first
+            samples = (np.frombuffer(audio_segment.raw_data, dtype=np.int16).astype(np.float32) / (2**15)).reshape(-1, audio_segment.channels)
+
+        if source_sr != target_sr:
+            self.logger.info(f"Resampling audio from {source_sr}Hz to {target_sr}Hz.")
+            ratio_gcd = gcd(int(target_sr), int(source_sr))
+            samples = resample_poly(samples, target_sr // ratio_gcd, source_sr // ratio_gcd, axis=0).astype(np.float32)
+        return samples
+
     def process_audio_file(self, input_filepath: Path, output_filepath: Path, delete_original: bool = False, progress_callback_func=None):
         """
         Processes an audio file for noise reduction and normalization.
@@ -77,93 +153,65 @@ class AudioProcessor:
         # Ensure output directory exists
         output_filepath.parent.mkdir(parents=True, exist_ok=True)
         
-        audio_segment = None # Initialize to None for finally block
         try:
             # Step 1: Load audio
             self.logger.info(f"Loading audio from: {input_filepath}")
             self._update_progress(5, 100, "Loading audio file...")
             
-            # Using pydub to load for broad format support
-            audio_segment = AudioSegment.from_file(input_filepath)
-            
-            # Convert to numpy array for noisereduce, using 16-bit PCM for VAD
-            # Ensure target sample rate (sr) matches what noisereduce expects and VAD supports (8k, 16k, 32k, 48k)
-            target_sr = self.config.get_setting("processing_parameters.audio_enhancement.sample_rate", 48000)
-            
-            if audio_segment.frame_rate != target_sr:
-                self.logger.info(f"Resampling audio from {audio_segment.frame_rate}Hz to {target_sr}Hz.")
-                audio_segment = audio_segment.set_frame_rate(target_sr)
-            
-            # Convert stereo to mono for VAD if needed, and ensure 16-bit depth
-            if audio_segment.channels > 1:
-                audio_segment = audio_segment.set_channels(1)
-            audio_segment = audio_segment.set_sample_width(2) # 16-bit samples
+            # All audio enhancement settings are read once, up front
+            audio_settings = self.config.get_setting("processing_parameters.audio_enhancement", {}) or {}
 
-            raw_audio_np = np.array(audio_segment.get_array_of_samples()).astype(np.float32) / (2**15) # Normalize to -1.0 to 1.0
+            # Ensure target sample rate (sr) matches what noisereduce expects and VAD supports (8k, 16k, 32k, 48k)
+            target_sr = audio_settings.get("sample_rate", 48000)
+            audio_np = self._load_audio(input_filepath, target_sr)
 
             # Step 2: Noise Reduction
-            noise_strength = self.config.get_setting("processing_parameters.audio_enhancement.noise_reduction_strength", 0.5)
+            noise_strength = audio_settings.get("noise_reduction_strength", 0.5)
             self.logger.info(f"Applying noise reduction with strength: {noise_strength}")
             self._update_progress(20, 100, "Applying noise reduction...")
 
+            # All channels are denoised as they are (noisereduce takes (channels, samples)), so stereo stays stereo
+            channel_count = audio_np.shape[1]
             reduced_noise_audio = nr.reduce_noise(
-                y=raw_audio_np, 
+                y=audio_np.T if channel_count > 1 else audio_np[:, 0],
                 sr=target_sr, 
                 prop_decrease=noise_strength,
                 stationary=True # Assumes noise is stationary (like fan hum, etc.)
-            )
+            ).reshape(channel_count, -1).T # Back to (frames, channels)
 
             # Step 3: Voice Activity Detection (VAD) and Silence Removal (Optional, based on config)
-            remove_silence = self.config.get_setting("processing_parameters.audio_enhancement.remove_silence", False)
+            remove_silence = audio_settings.get("remove_silence", False)
             if remove_silence:
                 self.logger.info("Applying Voice Activity Detection (VAD) to remove silence.")
                 self._update_progress(50, 100, "Detecting and removing silence...")
                 
-                # Convert numpy array back to pydub AudioSegment for split_on_silence
-                clean_audio_segment = AudioSegment(
-                    (reduced_noise_audio * (2**15)).astype(np.int16).tobytes(), 
-                    frame_rate=target_sr,
-                    sample_width=2,
-                    channels=1
-                )
+                min_silence_len = audio_settings.get("min_silence_len_ms", 1000)
+                silence_threshold_db = audio_settings.get("silence_thresh_db", -35)
 
-                min_silence_len = self.config.get_setting("processing_parameters.audio_enhancement.min_silence_len_ms", 1000)
-                silence_threshold_db = self.config.get_setting("processing_parameters.audio_enhancement.silence_thresh_db", -35)
-
-                audio_chunks = split_on_silence(
-                    clean_audio_segment,
-                    min_silence_len=min_silence_len,
-                    silence_thresh=silence_threshold_db,
-                    keep_silence=200 # Keep a small buffer around speech
+                # One vectorized RMS pass over the samples instead of pydub's per-millisecond slicing
+                # Silence is judged on the mix of all channels, and cut from every channel alike
+                keep_mask = _speech_keep_mask(
+                    reduced_noise_audio.mean(axis=1, dtype=np.float32), target_sr, min_silence_len, silence_threshold_db,
+                    keep_silence_ms=200 # Keep a small buffer around speech
                 )
-                if not audio_chunks:
+                final_audio_np = reduced_noise_audio[keep_mask]
+                if final_audio_np.size == 0:
                     self.logger.warning("No audio chunks detected after silence removal. Output will be empty.")
-                    # Create an empty audio segment
-                    final_audio_segment = AudioSegment.silent(duration=0, frame_rate=target_sr, sample_width=2)
-                else:
-                    final_audio_segment = sum(audio_chunks)
-                final_audio_np = np.array(final_audio_segment.get_array_of_samples()).astype(np.float32) / (2**15)
             else:
                 final_audio_np = reduced_noise_audio # If no silence removal, use noise-reduced audio
 
             # Step 4: Normalization
-            normalize_level_dbfs = self.config.get_setting("processing_parameters.audio_enhancement.normalization_level_dbfs", -3.0)
+            normalize_level_dbfs = audio_settings.get("normalization_level_dbfs", -3.0)
             self.logger.info(f"Applying normalization to {normalize_level_dbfs} dBFS.")
             self._update_progress(75, 100, "Applying normalization...")
 
-            # Convert numpy array back to pydub AudioSegment for normalization
-            # Ensure final_audio_np is not empty before converting
-            if final_audio_np.size == 0:
-                self.logger.warning("Final audio numpy array is empty after processing. Skipping normalization.")
-                final_normalized_audio_segment = AudioSegment.silent(duration=0, frame_rate=target_sr, sample_width=2)
+            # Peak normalization on the float samples; the only conversion back to pydub is for the export
+            peak = float(np.max(np.abs(final_audio_np))) if final_audio_np.size else 0.0
+            if peak == 0.0:
+                self.logger.warning("Final audio is empty or silent after processing. Skipping normalization.")
             else:
-                audio_for_norm = AudioSegment(
-                    (final_audio_np * (2**15)).astype(np.int16).tobytes(), 
-                    frame_rate=target_sr,
-                    sample_width=2,
-                    channels=1
-                )
-                final_normalized_audio_segment = audio_for_norm.normalize(normalize_level_dbfs)
+                final_audio_np = final_audio_np * (10 ** (normalize_level_dbfs / 20) / peak)
+            final_pcm = (np.clip(final_audio_np, -1.0, 1.0) * (2**15 - 1)).astype(np.int16)
 
             # Step 5: Save Result
             self.logger.info(f"Saving processed audio to: {output_filepath}")
@@ -177,7 +225,11 @@ class AudioProcessor:
                 output_filepath = output_filepath.with_suffix('.flac')
                 self.logger.warning(f"Unsupported output format '{output_filepath.suffix}', defaulting to .flac")
 
-            final_normalized_audio_segment.export(output_filepath, format=output_format)
+            if output_format in SOUNDFILE_SUBTYPES:
+                # No AudioSegment and no FFmpeg subprocess for the lossless/Vorbis formats
+                sf.write(str(output_filepath), final_pcm, target_sr, format=output_format.upper(), subtype=SOUNDFILE_SUBTYPES[output_format])
+            else:
+                AudioSegment(final_pcm.tobytes(), frame_rate=target_sr, sample_width=2, channels=channel_count).export(output_filepath, format=output_format)
 
             self._update_progress(100, 100, "Audio processing complete!")
             self.logger.info(f"Audio processing completed successfully: {output_filepath}")
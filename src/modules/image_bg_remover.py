@@ -1,12 +1,24 @@
 import os
 import io
+import logging
+import threading
 from pathlib import Path
-from PIL import Image, ImageEnhance, ImageFilter
+import numpy as np
+from PIL import Image, ImageOps
+from scipy.ndimage import convolve1d
 from rembg import remove # Ensure rembg is installed (pip install rembg)
 
+try:
+    import oxipng # Optional (pip install pyoxipng): faster and smaller PNG output
+except ImportError:
+    oxipng = None
+
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
 
+# 1D half of the separable 3x3 smoothing kernel used for sharpening and smoothing
+_SMOOTH_KERNEL_1D = np.array([1, 2, 1], dtype=np.float32) / 4
+
 class ImageProcessingError(Exception):
     """Custom exception for image processing errors."""
     pass
@@ -19,13 +31,24 @@ class ImageBgRemover:
     def __init__(self):
         self.logger = get_application_logger()
         self.config = get_application_config()
-        self._is_processing = False # Internal state to track if a process is in progress
-        self._external_progress_callback = None # Callback for GUI progress updates
+        # Independent images may be processed concurrently from several threads (the rembg
+        # ONNX session is safe for concurrent runs). Each calling thread keeps its own progress
+        # callback; callers that need mutual exclusion should hold their own lock.
+        self._task_state = threading.local()
+        self._state_lock = threading.Lock()
+        self._active_tasks = 0 # Number of images currently being processed
 
         # Retrieve the models directory from the configuration manager.
         # This path is set by the main application during startup, ensuring models
         # are looked for in the application's designated directory (e.g., C:\Program Files\Creators Toolkit\models).
         self.models_dir = Path(self.config.get_setting("app_settings.models_dir"))
+
+        # PNG encoder settings, see _write_png
+        self._compress_level = self.config.get_setting("processing_parameters.image_background_removal.png_compress_level", 9)
+        self._use_oxipng = self.config.get_setting("processing_parameters.image_background_removal.use_oxipng", False)
+        if self._use_oxipng and oxipng is None:
+            self.logger.warning("PNG optimization with oxipng is enabled, but 'pyoxipng' is not installed. Falling back to Pillow's encoder.")
+            self._use_oxipng = False
         self.logger.info(f"ImageBgRemover initialized. Models directory set to: {self.models_dir}")
 
     def _update_progress(self, progress_percentage: int, message: str, level: str = "info"):
@@ -33,16 +56,27 @@ class ImageBgRemover:
         Internal helper to update progress and log messages.
         Ensures progress_percentage is within a valid range [0, 100].
         """
-        if self._external_progress_callback:
+        progress_callback = getattr(self._task_state, "progress_callback", None)
+        if progress_callback:
             # Clamp progress percentage to ensure it's always between 0 and 100
             clamped_percentage = max(0, min(100, progress_percentage))
-            self._external_progress_callback(clamped_percentage, message)
-        self.logger.log(getattr(logging, level.upper()), f"IMAGE_PROGRESS: {message} ({progress_percentage}%)")
+            progress_callback(clamped_percentage, message)
+        # %-style arguments defer formatting until a handler actually emits the record
+        self.logger.log(getattr(logging, level.upper()), "IMAGE_PROGRESS: %s (%d%%)", message, progress_percentage)
+
+    def _blur3x3(self, rgb: np.ndarray) -> np.ndarray:
+        """
+        Separable 3x3 [1, 2, 1] blur applied as two 1D passes (rows, then columns).
+        """
+        blurred = convolve1d(rgb, _SMOOTH_KERNEL_1D, axis=0, mode='nearest')
+        return convolve1d(blurred, _SMOOTH_KERNEL_1D, axis=1, mode='nearest')
 
     def _enhance_quality(self, image: Image.Image) -> Image.Image:
         """
         Applies quality enhancements to an image (contrast, sharpness, smoothing).
         Ensures the image remains in RGBA mode for transparency.
+        All three steps run on a single float32 buffer, and the blurred copy needed for
+        sharpening is computed once instead of Pillow running its own SMOOTH pass for it.
         
         Args:
             image (Image.Image): The PIL Image object to enhance.
@@ -55,23 +89,42 @@ class ImageBgRemover:
             image = image.convert('RGBA')
             
         # Separate RGB and Alpha channels to apply enhancements only to RGB
-        rgb = image.convert('RGB')
+        rgb_image = image.convert('RGB')
         alpha = image.getchannel('A')
+        rgb = np.asarray(rgb_image, dtype=np.float32)
 
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(rgb)
-        rgb = enhancer.enhance(1.2) # Increased contrast slightly
+        # Enhance contrast around the mean luminance, as ImageEnhance.Contrast does
+        mean_luminance = int(np.asarray(rgb_image.convert('L')).mean() + 0.5)
+        rgb -= mean_luminance
+        rgb *= 1.2 # Increased contrast slightly
+        rgb += mean_luminance
+        np.clip(rgb, 0, 255, out=rgb)
 
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(rgb)
-        rgb = enhancer.enhance(1.3) # Increased sharpness slightly
+        # Enhance sharpness (unsharp mask against the low-pass copy)
+        blurred = self._blur3x3(rgb)
+        rgb += 0.3 * (rgb - blurred) # Increased sharpness slightly (factor 1.3)
+        np.clip(rgb, 0, 255, out=rgb)
 
         # Apply a light smoothing filter to reduce potential artifacts from other processing
-        rgb = rgb.filter(ImageFilter.SMOOTH)
+        rgb = self._blur3x3(rgb)
 
         # Recombine with the original alpha channel to maintain transparency
-        r, g, b = rgb.split()
-        return Image.merge('RGBA', (r, g, b, alpha))
+        enhanced = Image.fromarray(np.rint(rgb).astype(np.uint8), 'RGB')
+        enhanced.putalpha(alpha)
+        return enhanced
+
+    def _write_png(self, image: Image.Image, output_filepath: Path):
+        """
+        Encodes the image as PNG to output_filepath.
+        When oxipng is enabled, Pillow writes an uncompressed PNG to memory and oxipng
+        compresses it, which is both faster and smaller than Pillow's zlib at level 9.
+        """
+        if self._use_oxipng:
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG", compress_level=0)
+            output_filepath.write_bytes(oxipng.optimize_from_memory(buffer.getvalue(), level=2))
+        else:
+            image.save(output_filepath, "PNG", compress_level=self._compress_level)
 
     def remove_background_and_enhance(self, input_filepath: Path, output_filepath: Path, delete_original: bool = False, progress_callback_func=None):
         """
@@ -86,22 +139,29 @@ class ImageBgRemover:
         Returns:
             tuple: (bool, str) - True if successful, False otherwise, and a message.
         """
-        if self._is_processing:
-            self.logger.warning("Attempted to start image processing while another is in progress.")
-            return False, "Another image processing task is already in progress. Please wait."
+        with self._state_lock:
+            self._active_tasks += 1
+        self._task_state.progress_callback = progress_callback_func
+        try:
+            return self._process_image(input_filepath, output_filepath, delete_original)
+        finally:
+            self._task_state.progress_callback = None # Clear callback to prevent stale references
+            with self._state_lock:
+                self._active_tasks -= 1
 
-        self._is_processing = True
-        self._external_progress_callback = progress_callback_func
+    def _process_image(self, input_filepath: Path, output_filepath: Path, delete_original: bool):
+        """
+        Performs the background removal for a single image on the calling thread.
+        See remove_background_and_enhance for the arguments and return value.
+        """
         self.logger.info(f"Attempting to process image from '{input_filepath}' to '{output_filepath}'")
         self._update_progress(0, "Starting image processing...")
 
         if not input_filepath.exists():
-            self._is_processing = False
             self.logger.error(f"Input image file not found: {input_filepath}")
             return False, f"Input image file does not exist: {input_filepath}"
         
         if not input_filepath.is_file():
-            self._is_processing = False
             self.logger.error(f"Input path is not a file: {input_filepath}")
             return False, f"Input path is not a file: {input_filepath}"
 
@@ -119,14 +179,23 @@ class ImageBgRemover:
             self.logger.info(f"Loading image and removing background from: {input_filepath}")
             self._update_progress(10, "Removing background...")
             
-            with open(input_filepath, 'rb') as f:
-                input_bytes = f.read()
+            # Decode straight from the path; no intermediate bytes/BytesIO buffer is allocated.
+            # Pillow's convert() always copies, so only call it when the mode actually differs.
+            # rembg applies the EXIF orientation before predicting the mask, so the image the mask
+            # is attached to must be transposed the same way or the alpha lands on the wrong pixels.
+            with Image.open(input_filepath) as input_image:
+                input_image.load()
+                oriented_image = ImageOps.exif_transpose(input_image)
+                img_rgb = oriented_image if oriented_image.mode == 'RGB' else oriented_image.convert('RGB')
 
             # Call rembg.remove, explicitly setting the model_dir
             # The 'u2net' model is the default for rembg.
-            output_bytes = remove(input_bytes, model_dir=str(self.models_dir), model_name="u2net")
-            
-            img_processed = Image.open(io.BytesIO(output_bytes)).convert('RGBA')
+            # Only the single-channel mask is requested; attaching it as the alpha channel here
+            # avoids rembg encoding (and us decoding) a full RGBA PNG.
+            mask = remove(img_rgb, only_mask=True, model_dir=str(self.models_dir), model_name="u2net")
+
+            img_rgb.putalpha(mask if mask.mode == 'L' else mask.convert('L'))
+            img_processed = img_rgb
 
             # Step 2: Apply quality enhancement if configured
             apply_enhancement = self.config.get_setting("processing_parameters.image_background_removal.image_quality_enhancement", True)
@@ -142,13 +211,9 @@ class ImageBgRemover:
             self._update_progress(90, "Saving processed image...")
             
             # Save as PNG to preserve transparency
-            # compress_level=9 offers maximum compression but takes more time.
-            # Adjust if speed is a higher priority than file size.
-            img_final.save(output_filepath, "PNG", compress_level=9) 
-
-            self._update_progress(100, "Image processing complete!")
-            self.logger.info(f"Image processing completed successfully: {output_filepath}")
+            self._write_png(img_final, output_filepath)
 
+            # Delete the original only after the output has been written successfully
             if delete_original:
                 self.logger.info(f"Attempting to delete original file: {input_filepath}")
                 try:
@@ -156,12 +221,13 @@ class ImageBgRemover:
                     self.logger.info(f"Original file deleted: {input_filepath}")
                 except OSError as e:
                     self.logger.warning(f"Failed to delete original file {input_filepath}: {e}. Skipping deletion.")
-            
-            self._is_processing = False
+
+            self._update_progress(100, "Image processing complete!")
+            self.logger.info(f"Image processing completed successfully: {output_filepath}")
+
             return True, f"Image processing complete! Saved to: {output_filepath}"
 
         except ImageProcessingError as e:
-            self._is_processing = False
             self.logger.error(f"Image processing failed: {e}", exc_info=True)
             if output_filepath.exists():
                 try:
@@ -171,7 +237,6 @@ class ImageBgRemover:
                     self.logger.warning(f"Failed to clean up partial output file {output_filepath}: {cleanup_e}")
             return False, f"Image processing failed: {e}"
         except Exception as e:
-            self._is_processing = False
             self.logger.error(f"An unexpected error occurred during image processing from '{input_filepath}' to '{output_filepath}': {e}", exc_info=True)
             # If the rembg model is missing, this is where it might manifest.
             if "onnxruntime.capi.onnxruntime_pybind11_state.Fail" in str(e) or "No such file or directory" in str(e):
@@ -185,10 +250,8 @@ class ImageBgRemover:
                 except Exception as cleanup_e:
                     self.logger.warning(f"Failed to clean up partial output file {output_filepath}: {cleanup_e}")
             return False, f"An unexpected error occurred during processing: {e}"
-        finally:
-            self._external_progress_callback = None # Clear callback to prevent stale references
 
 
     def is_processing(self) -> bool:
-        """Returns True if an image processing task is currently in progress, False otherwise."""
-        return self._is_processing
\ No newline at end of file
+        """Returns True if at least one image processing task is currently in progress, False otherwise."""
+        return self._active_tasks > 0
\ No newline at end of file
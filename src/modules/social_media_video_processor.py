@@ -1,32 +1,166 @@
 import os
+import sys
 import shutil
 import subprocess
 import logging
 import cv2
 import numpy as np
 from pathlib import Path
-from moviepy import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip, ImageClip # MoviePy for complex overlays/compositing
+from moviepy import VideoFileClip, CompositeVideoClip, TextClip, ImageClip # MoviePy for complex overlays/compositing
 from moviepy.video.fx.Crop import Crop as moviepy_crop_fx # Renamed to avoid conflict
-from moviepy.video.fx.Resize import Resize as moviepy_resize_fx # Renamed to avoid conflict
 from pydub import AudioSegment
-from typing import List, Dict, Any, Optional, Callable, Tuple
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator
 # from pydub.silence import split_on_silence # No longer needed, handled by AudioProcessor or Vosk timestamps
-import speech_recognition as sr # For initial transcription concept, will be replaced with Vosk
 from vosk import Model, KaldiRecognizer # Removed set_log_level, as it's causing ImportError
 import math
 import tempfile
-import atexit
+import functools
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 import json # For Vosk model info, and subtitle timing details
 
+try:
+    from numba import njit # Optional: compiles the subtitle line-break kernel
+except ImportError:
+    njit = None
+
 # Core modules
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
 from src.utils.font_manager import get_application_font_manager
+from src.utils.ffmpeg_tools import HARDWARE_H264_ENCODERS, X264_THREADS, get_ffmpeg_binary, get_ffprobe_binary, get_hardware_h264_encoder
 
 # Import specific modules for enhancements if needed (DRY principle)
 from src.modules.audio_processor import AudioProcessor # Reusing for audio enhancement
 from src.modules.video_enhancer import VideoEnhancer # Reusing for video enhancement
 
+# Long audio is transcribed as overlapping windows recognized in parallel
+VOSK_WINDOW_SECONDS = 60
+VOSK_WINDOW_OVERLAP_SECONDS = 2
+VOSK_BYTES_PER_SECOND = 16000 * 2 # 16kHz, 16-bit mono
+VOSK_CHUNK_BYTES = 65536 # ~2 s of audio per AcceptWaveform call
+
+@functools.lru_cache(maxsize=4)
+def _get_vosk_model(model_path: str) -> Model:
+    """
+    Loads a Vosk model once per path and shares it across processor instances and calls.
+    Recognizers are cheap and are created per transcription; the model is the expensive part.
+    """
+    return Model(model_path)
+
+# Overlay images and fonts are usually the same set for every video a user processes, so the
+# file checks are cached. Misses raise instead of returning, and lru_cache does not cache
+# exceptions: a file that is added later is found without restarting the application.
+@functools.lru_cache(maxsize=256)
+def _existing_file(path_str: str) -> Path:
+    path = Path(path_str)
+    if not path.is_file():
+        raise FileNotFoundError(path_str)
+    return path
+
+@functools.lru_cache(maxsize=256)
+def _usable_font_file(path_str: str) -> Path:
+    with open(_existing_file(path_str), "rb") as f:
+        if f.read(4) not in (b"\x00\x01\x00\x00", b"OTTO", b"true", b"ttcf"):
+            raise ValueError(f"Not a TrueType/OpenType font: {path_str}")
+    return Path(path_str)
+
+def _resolve_overlay_image(path_str: str) -> Optional[Path]:
+    """Returns the overlay image path if the file exists, else None (cached per path)."""
+    try:
+        return _existing_file(str(path_str))
+    except FileNotFoundError:
+        return None
+
+# ffprobe output per file version: the key includes mtime and size, so a file that is replaced or
+# edited in place is probed again. Failed probes raise and are not cached.
+@functools.lru_cache(maxsize=64)
+def _ffprobe_streams(ffprobe_binary: str, path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    cmd_probe = [
+        ffprobe_binary, "-v", "error",
+        "-show_entries", "stream=codec_type,codec_name,pix_fmt,width,height,duration:format=duration",
+        "-of", "json",
+        path_str
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    process = subprocess.run(cmd_probe, check=True, capture_output=True, text=True, encoding='utf-8', creationflags=creationflags)
+    return json.loads(process.stdout)
+
+# Output arguments for every final H.264/MP4 encode: 4:2:0 Main profile plays everywhere, and
+# +faststart moves the moov atom to the front so uploads and mobile playback need no full scan.
+MP4_DELIVERY_ARGS = ["-pix_fmt", "yuv420p", "-profile:v", "main", "-movflags", "+faststart"]
+# libx264 only; the hardware encoders have no equivalent tune
+X264_DELIVERY_ARGS = ["-tune", "fastdecode"]
+# libx264 settings for preview renders (processing_options["preview"]): lowest encode latency, with
+# short GOPs so a partial file is seekable early; the final-quality preset/CRF are used otherwise
+X264_PREVIEW_ARGS = ["-preset", "ultrafast", "-tune", "zerolatency", "-g", "30", "-crf", "28"]
+
+# Parallel rendering of composited frames for the piped export: each worker renders contiguous
+# segments of this many seconds, and may run this many frames ahead of the encoder.
+# Workers are capped because each one holds its own decoder and overlay clips.
+PIPE_RENDER_SEGMENT_SECONDS = 5
+PIPE_RENDER_QUEUE_FRAMES = 4
+PIPE_RENDER_MAX_WORKERS = 8
+# Overlay clips (image reads, text rasterization) are built on at most this many threads
+OVERLAY_BUILD_MAX_WORKERS = 8
+
+# RAM-backed (tmpfs) location for the temporary working directory on Linux
+RAM_TEMP_DIR = Path("/dev/shm")
+
+# Escapes a path for a single-quoted FFmpeg filter option value in one translate() pass:
+# forward slashes (Windows too), escaped drive colons, and quotes closed/escaped/reopened.
+_FILTER_PATH_ESCAPE = str.maketrans({"\\": "/", ":": "\\:", "'": "'\\\\\\''"})
+# Same quoting for other user-supplied option values (e.g. colours), keeping backslashes literal
+_FILTER_VALUE_ESCAPE = str.maketrans({"\\": "\\\\", ":": "\\:", "'": "'\\\\\\''"})
+
+# Subtitle lines break after this many seconds of silence between two words
+SUBTITLE_PAUSE_SECONDS = 0.5
+
+def _subtitle_line_bounds_loop(starts: np.ndarray, ends: np.ndarray, words_per_line: int, pause_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns [start, end) word index arrays of the subtitle lines: a line ends after words_per_line
+    words, at the last word, or before a pause. Single pass; meant to be compiled with Numba.
+    """
+    word_count = starts.shape[0]
+    line_starts = np.empty(word_count, dtype=np.int64)
+    line_ends = np.empty(word_count, dtype=np.int64)
+    line_count = 0
+    line_start = 0
+    for i in range(word_count):
+        if (i - line_start + 1 == words_per_line or i == word_count - 1 or
+                starts[i + 1] - ends[i] > pause_seconds):
+            line_starts[line_count] = line_start
+            line_ends[line_count] = i + 1
+            line_count += 1
+            line_start = i + 1
+    return line_starts[:line_count], line_ends[:line_count]
+
+def _subtitle_line_bounds_numpy(starts: np.ndarray, ends: np.ndarray, words_per_line: int, pause_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Same result as _subtitle_line_bounds_loop without Numba: pauses are found in one vectorized
+    pass and the word-count breaks restart after each pause, so Python only loops per pause segment.
+    """
+    pause_breaks = np.flatnonzero(starts[1:] - ends[:-1] > pause_seconds) + 1
+    segment_starts = np.concatenate(([0], pause_breaks))
+    segment_ends = np.concatenate((pause_breaks, [starts.shape[0]]))
+    line_starts = np.concatenate([
+        np.arange(segment_start, segment_end, words_per_line)
+        for segment_start, segment_end in zip(segment_starts, segment_ends)
+    ])
+    # A line ends where the next one starts, except at pause segment ends
+    line_ends = np.minimum(line_starts + words_per_line, segment_ends[np.searchsorted(segment_ends, line_starts, side="right")])
+    return line_starts, line_ends
+
+_subtitle_line_bounds = njit(cache=True)(_subtitle_line_bounds_loop) if njit else _subtitle_line_bounds_numpy
+
+# Content boxes of recently analyzed videos, keyed by (resolved path, size, mtime_ns) so an edited
+# file is re-analyzed. Re-runs on the same asset (e.g. with different subtitle settings) skip the decode pass.
+_CONTENT_BOX_CACHE: "OrderedDict[Tuple[str, int, int], Optional[Tuple[int, int, int, int]]]" = OrderedDict()
+_CONTENT_BOX_CACHE_SIZE = 64
+_content_box_cache_lock = threading.Lock()
+
 class SocialMediaVideoProcessorError(Exception):
     """Custom exception for social media video processor errors."""
     pass
@@ -38,6 +172,10 @@ class SocialMediaVideoProcessor:
     Optimized for efficiency using FFmpeg, OpenCV, Vosk for offline ASR,
     and reusing existing audio/video enhancement modules.
     """
+    # Deleting a large original (slow on network mounts) runs here, off the processing call.
+    # One worker keeps deletions in order; its non-daemon thread lets pending ones finish at exit.
+    _deletion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="social_media_delete")
+
     def __init__(self):
         self.logger = get_application_logger()
         self.config = get_application_config()
@@ -47,11 +185,25 @@ class SocialMediaVideoProcessor:
 
         self._is_processing = False # Internal state to track if a process is in progress
         self._external_progress_callback = None # Callback for GUI progress updates
+        self._progress_lock = threading.Lock() # The audio branch reports progress from a worker thread
+        self._last_progress = 0
+
+        # Content analysis runs alongside the audio branch (FFmpeg decode, Vosk threads); cap OpenCV's
+        # pool at half the cores so the two don't oversubscribe the CPU
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // 2))
 
         # Retrieve models directory from config for Vosk
         self.models_dir = Path(self.config.get_setting("app_settings.models_dir"))
         self.vosk_model_path = self.models_dir / "vosk-model-en-us-0.22" # Example Vosk model name
-        self.vosk_recognizer = None # Will be initialized on demand
+        self._subtitle_style_cache = {} # ASS style fields per subtitle option combination, see _get_subtitle_style
+        self._h264_encoder = None # Probed lazily from the FFmpeg build, see _get_hardware_h264_encoder
+        self._audio_codec_cache = {} # First audio stream codec per file, see _get_audio_codec_args
+        self._video_format_cache = {} # (codec, pixel format) of the first video stream per probed file
+        self._text_clip_cache = {} # Rendered overlay TextClips per text and style, see _compose_overlay_clip
+        # Every FFmpeg and ffprobe command below runs these (see src/utils/ffmpeg_tools.py)
+        self.ffmpeg_binary = get_ffmpeg_binary()
+        self.ffprobe_binary = get_ffprobe_binary()
 
         self.logger.info("SocialMediaVideoProcessor initialized.")
 
@@ -60,9 +212,13 @@ class SocialMediaVideoProcessor:
         Internal helper to update progress and log messages.
         Ensures progress_percentage is within a valid range [0, 100].
         """
-        if self._external_progress_callback:
-            clamped_percentage = max(0, min(100, progress_percentage))
-            self._external_progress_callback(clamped_percentage, message)
+        with self._progress_lock:
+            # Audio and video branches run concurrently; never let the reported percentage go backwards
+            progress_percentage = max(self._last_progress, progress_percentage)
+            self._last_progress = progress_percentage
+            if self._external_progress_callback:
+                clamped_percentage = max(0, min(100, progress_percentage))
+                self._external_progress_callback(clamped_percentage, message)
         self.logger.log(getattr(logging, level.upper()), f"SOCIAL_MEDIA_PROCESS_PROGRESS: {message} ({progress_percentage}%)")
 
     def _run_ffmpeg_command(self, command: List[str], description: str, log_level: str = "info") -> Tuple[bool, str]:
@@ -90,7 +246,633 @@ class SocialMediaVideoProcessor:
             self.logger.error(f"An unexpected error occurred while running FFmpeg command for {description}: {e}", exc_info=True)
             return False, f"Unexpected error: {e}"
 
+    def _delete_original_file(self, input_filepath: Path):
+        """Removes the original input file; runs on _deletion_executor and only logs failures."""
+        try:
+            os.remove(input_filepath)
+            self.logger.info(f"Original file deleted: {input_filepath}")
+        except OSError as e:
+            self.logger.warning(f"Failed to delete original file {input_filepath}: {e}. Skipping deletion.")
+
+    def _get_temp_parent_dir(self, input_filepath: Path) -> Optional[str]:
+        """
+        Returns the tmpfs mount to hold the temporary working directory, so the intermediate audio and
+        video never hit the disk, or None for the system temp dir. tmpfs is used only when enabled in the
+        settings and it has room for twice the input file (intermediates are at most about that size).
+        """
+        if not self.config.get_setting("processing_parameters.social_media_post_processing.use_ram_temp_dir", True):
+            return None
+        if sys.platform != "linux" or not RAM_TEMP_DIR.is_dir():
+            return None
+        try:
+            free_bytes = shutil.disk_usage(RAM_TEMP_DIR).free
+            needed_bytes = input_filepath.stat().st_size * 2
+        except OSError as e:
+            self.logger.warning(f"Could not check free space in {RAM_TEMP_DIR}: {e}. Using the system temp directory.")
+            return None
+        if free_bytes < needed_bytes:
+            self.logger.info(f"Not enough free space in {RAM_TEMP_DIR} ({free_bytes} bytes free, {needed_bytes} needed). Using the system temp directory.")
+            return None
+        return str(RAM_TEMP_DIR)
+
+    def _probe_video_properties(self, video_filepath: Path) -> Tuple[float, int, int, bool]:
+        """
+        Reads duration and dimensions of the first video stream, and whether the file has
+        an audio stream, with a single ffprobe call (cached per path, mtime and size).
+        
+        Returns:
+            Tuple[float, int, int, bool]: (duration in seconds, width, height, has audio).
+        """
+        try:
+            file_stat = Path(video_filepath).stat()
+            probe_data = _ffprobe_streams(self.ffprobe_binary, str(video_filepath), file_stat.st_mtime_ns, file_stat.st_size)
+            streams = probe_data["streams"]
+            stream = next(s for s in streams if s.get("codec_type") == "video")
+            audio_codecs = [s.get("codec_name") for s in streams if s.get("codec_type") == "audio"]
+            has_audio = bool(audio_codecs)
+            self._audio_codec_cache[Path(video_filepath)] = audio_codecs[0] if audio_codecs else None
+            self._video_format_cache[Path(video_filepath)] = (stream.get("codec_name"), stream.get("pix_fmt"))
+            # Some containers only report the duration at format level
+            duration = float(stream.get("duration") or probe_data.get("format", {}).get("duration") or 0.0)
+            return duration, int(stream["width"]), int(stream["height"]), has_audio
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"ffprobe failed for {video_filepath}. STDERR: {e.stderr}")
+            raise SocialMediaVideoProcessorError(f"Could not read video properties: {e.stderr}")
+        except FileNotFoundError:
+            self.logger.critical(f"ffprobe executable not found ({self.ffprobe_binary}). Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            raise SocialMediaVideoProcessorError("ffprobe not found. Please install FFmpeg and add it to PATH.")
+        except (KeyError, StopIteration, ValueError) as e:
+            self.logger.error(f"Unexpected ffprobe output for {video_filepath}: {e}", exc_info=True)
+            raise SocialMediaVideoProcessorError(f"Could not read video properties from: {video_filepath}")
+
+    def _get_audio_codec_args(self, audio_path: Path) -> List[str]:
+        """
+        Returns the FFmpeg audio codec arguments for muxing audio_path's first audio stream into MP4.
+        AAC is stream-copied; anything else is encoded to AAC. The codec is probed once per file.
+        """
+        audio_path = Path(audio_path)
+        if audio_path not in self._audio_codec_cache:
+            cmd_probe = [
+                self.ffprobe_binary, "-v", "error",
+                "-select_streams", "a:0",
+                "-show_entries", "stream=codec_name",
+                "-of", "csv=p=0",
+                str(audio_path)
+            ]
+            try:
+                creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+                process = subprocess.run(cmd_probe, check=True, capture_output=True, text=True, encoding='utf-8', creationflags=creationflags)
+                self._audio_codec_cache[audio_path] = process.stdout.strip() or None
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                self.logger.warning(f"Could not probe the audio codec of {audio_path}; it will be re-encoded: {e}")
+                self._audio_codec_cache[audio_path] = None
+        if self._audio_codec_cache[audio_path] == "aac":
+            self.logger.debug(f"Audio in {audio_path} is already AAC; copying the stream.")
+            return ["-c:a", "copy"]
+        return ["-c:a", "aac", "-b:a", "192k"]
+
+    def _get_hardware_h264_encoder(self) -> Optional[str]:
+        """
+        Returns the hardware H.264 encoder to use (see get_hardware_h264_encoder), or None to use libx264.
+        Callers fall back to libx264 if a hardware command fails, and the encoder is then disabled for this instance.
+        """
+        if self._h264_encoder is None:
+            self._h264_encoder = get_hardware_h264_encoder(self.ffmpeg_binary) or ""
+        return self._h264_encoder or None
+
+    def _disable_hardware_encoder(self, description: str):
+        """Stops using the hardware encoder for this instance after a failed hardware encode."""
+        self.logger.warning(f"{self._h264_encoder} encoding failed for {description}. Falling back to libx264 software encoding.")
+        self._h264_encoder = ""
+
+    @staticmethod
+    def _get_x264_args(x264_preset: str, preview: bool) -> List[str]:
+        """libx264 preset, rate control and tune arguments for a final export or a preview render."""
+        if preview:
+            return X264_PREVIEW_ARGS
+        return ["-preset", x264_preset, "-crf", "23", *X264_DELIVERY_ARGS]
+
+    def _encode_with_filters(self, source_path: Path, output_path: Path, video_filter: str, description: str,
+                             audio_path: Optional[Path] = None, x264_preset: str = "faster",
+                             image_inputs: Optional[List[Path]] = None, preview: bool = False) -> Tuple[bool, str]:
+        """
+        Re-encodes the video stream through a single FFmpeg filtergraph.
+        When audio_path is given, its first audio stream is encoded to AAC and muxed into the same
+        output (it may be the source itself); otherwise the output has no audio.
+        When image_inputs is a list (possibly empty), its images become inputs 1..N and video_filter
+        is used as a -filter_complex graph that must end in the [vout] label.
+        x264_preset only applies to the libx264 path, and is replaced by X264_PREVIEW_ARGS if preview is set.
+        With no filter at all and an H.264 yuv420p source (as probed by _probe_video_properties),
+        the video stream is copied instead of re-encoded.
+        Uses a hardware H.264 encoder when available and falls back to libx264 if the hardware pass fails.
+        """
+        if source_path == output_path:
+            self.logger.info(f"Nothing to do for {description}; skipping the encode.")
+            return True, "No-op"
+
+        input_args = ["-i", str(source_path)]
+        if image_inputs is not None:
+            for image_path in image_inputs:
+                input_args += ["-i", str(image_path)]
+            filter_args = ["-filter_complex", video_filter, "-map", "[vout]"]
+        else:
+            filter_args = (["-vf", video_filter] if video_filter else []) + ["-map", "0:v:0"]
+
+        if audio_path is None:
+            audio_args = ["-an"]
+        elif audio_path == source_path:
+            audio_args = ["-map", "0:a:0", *self._get_audio_codec_args(audio_path)]
+        else:
+            input_args += ["-i", str(audio_path)]
+            audio_args = ["-map", f"{len(image_inputs or []) + 1}:a:0", *self._get_audio_codec_args(audio_path), "-shortest"]
+
+        # Nothing to filter and the source is already H.264 4:2:0: copy the video stream instead of re-encoding
+        if not video_filter and image_inputs is None and self._video_format_cache.get(Path(source_path)) == ("h264", "yuv420p"):
+            cmd_copy = [
+                self.ffmpeg_binary,
+                *input_args,
+                *filter_args,
+                "-c:v", "copy",
+                "-movflags", "+faststart",
+                *audio_args,
+                "-y", str(output_path)
+            ]
+            success, msg = self._run_ffmpeg_command(cmd_copy, f"{description} (stream copy)")
+            if success:
+                return success, msg
+            self.logger.warning(f"Stream copy failed for {description}; re-encoding instead.")
+
+        # Filters (enhancement, subtitles, overlays) use every logical core explicitly; x264 uses X264_THREADS
+        cpu_threads = str(os.cpu_count() or 1)
+        thread_args = ["-filter_threads", cpu_threads, "-filter_complex_threads", cpu_threads]
+
+        hardware_encoder = self._get_hardware_h264_encoder()
+        if hardware_encoder:
+            # With NVENC, also decode on the GPU (NVDEC); the filters stay in the CPU filtergraph.
+            hwaccel_args = ["-hwaccel", "cuda"] if hardware_encoder == "h264_nvenc" else [] # Applies to the first (main video) input only
+            cmd_hardware = [
+                self.ffmpeg_binary,
+                *thread_args,
+                *hwaccel_args,
+                *input_args,
+                *filter_args,
+                "-c:v", hardware_encoder,
+                *HARDWARE_H264_ENCODERS[hardware_encoder],
+                *MP4_DELIVERY_ARGS,
+                *audio_args,
+                "-y", str(output_path)
+            ]
+            success, msg = self._run_ffmpeg_command(cmd_hardware, f"{description} ({hardware_encoder})")
+            if success:
+                return success, msg
+            self._disable_hardware_encoder(description)
+
+        cmd_x264 = [
+            self.ffmpeg_binary,
+            *thread_args,
+            *input_args,
+            *filter_args,
+            "-c:v", "libx264", # Re-encode with h264
+            *self._get_x264_args(x264_preset, preview),
+            "-threads", str(X264_THREADS),
+            *MP4_DELIVERY_ARGS,
+            *audio_args,
+            "-y", str(output_path)
+        ]
+        return self._run_ffmpeg_command(cmd_x264, description)
+
+    @staticmethod
+    def _is_usable_font_file(font_path: Optional[Path]) -> bool:
+        """True if font_path is a real TrueType/OpenType font (placeholder files are rejected); cached per path."""
+        if not font_path:
+            return False
+        try:
+            _usable_font_file(str(font_path))
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _build_overlay_filtergraph(self, base_filters: List[str], overlays_data: List[Dict[str, Any]],
+                                   video_duration: float, temp_working_dir: Path) -> Optional[Tuple[str, List[Path]]]:
+        """
+        Expresses base_filters plus all overlays as one FFmpeg -filter_complex graph ending in [vout]:
+        text overlays become drawtext filters, image overlays become extra inputs scaled and
+        composited with the overlay filter, each enabled only between its start and end time.
+        
+        Returns:
+            Optional[Tuple[str, List[Path]]]: (filtergraph, image input paths), or None if an overlay
+                                              can't be rendered by FFmpeg (e.g. its font has no usable file).
+        """
+        # Named MoviePy positions as FFmpeg expressions; drawtext and overlay name the sizes differently
+        drawtext_positions = (
+            {"center": "(w-text_w)/2", "left": "0", "right": "w-text_w"},
+            {"center": "(h-text_h)/2", "top": "0", "bottom": "h-text_h"}
+        )
+        overlay_positions = (
+            {"center": "(W-w)/2", "left": "0", "right": "W-w"},
+            {"center": "(H-h)/2", "top": "0", "bottom": "H-h"}
+        )
+
+        def position_expr(value: Any, named: Dict[str, str]) -> Optional[str]:
+            if isinstance(value, str) and value in named:
+                return named[value]
+            try:
+                return str(int(float(value))) # Pixel value
+            except (TypeError, ValueError):
+                return None
+
+        chain = [f"[0:v]{','.join(base_filters) if base_filters else 'null'}[v0]"]
+        image_inputs = []
+        current_label = "v0"
+        for index, overlay_info in enumerate(overlays_data):
+            start_time = float(overlay_info.get("start_time", 0))
+            end_time = float(overlay_info.get("end_time", video_duration))
+            if overlay_info.get("duration"):
+                end_time = start_time + float(overlay_info["duration"])
+            enable = f"enable='between(t,{start_time:.3f},{end_time:.3f})'"
+            position_x = overlay_info.get("position_x", "center") # "center" or pixel value
+            position_y = overlay_info.get("position_y", "center") # "center" or pixel value
+            next_label = f"v{index + 1}"
+
+            if overlay_info.get("text"):
+                font_path = self.font_manager.get_font_path(overlay_info.get("font_name", "Arial"))
+                if not self._is_usable_font_file(font_path):
+                    self.logger.info(f"No usable font file for text overlay '{overlay_info['text']}'; using MoviePy compositing.")
+                    return None
+                # The text goes through a file so it needs no filtergraph escaping, and expansion=none
+                # keeps drawtext from interpreting '%' sequences and backslashes in it
+                text_file = temp_working_dir / f"overlay_text_{index}.txt"
+                text_file.write_text(overlay_info["text"], encoding="utf-8")
+                x_expr = position_expr(position_x, drawtext_positions[0])
+                y_expr = position_expr(position_y, drawtext_positions[1])
+                if x_expr is None or y_expr is None:
+                    self.logger.info(f"Unsupported position for text overlay '{overlay_info['text']}'; using MoviePy compositing.")
+                    return None
+                drawtext_options = [
+                    f"fontfile={self._escape_filter_path(font_path)}",
+                    f"textfile={self._escape_filter_path(text_file)}",
+                    "expansion=none",
+                    f"fontsize={overlay_info.get('font_size', 50)}",
+                    f"fontcolor={self._escape_filter_value(overlay_info.get('color', 'white'))}",
+                    f"x={x_expr}", f"y={y_expr}"
+                ]
+                if overlay_info.get("stroke_color") and overlay_info.get("stroke_width", 0):
+                    drawtext_options += [f"bordercolor={self._escape_filter_value(overlay_info['stroke_color'])}", f"borderw={overlay_info['stroke_width']}"]
+                if overlay_info.get("bg_color"):
+                    drawtext_options += ["box=1", f"boxcolor={self._escape_filter_value(overlay_info['bg_color'])}"]
+                drawtext_options.append(enable)
+                chain.append(f"[{current_label}]drawtext={':'.join(drawtext_options)}[{next_label}]")
+                self.logger.debug(f"Added text overlay: '{overlay_info['text']}'")
+
+            elif overlay_info.get("image_path"):
+                image_path = _resolve_overlay_image(overlay_info["image_path"])
+                if image_path is None:
+                    self.logger.warning(f"Overlay image not found: {overlay_info['image_path']}")
+                    continue
+                x_expr = position_expr(position_x, overlay_positions[0])
+                y_expr = position_expr(position_y, overlay_positions[1])
+                if x_expr is None or y_expr is None:
+                    self.logger.info(f"Unsupported position for image overlay '{image_path}'; using MoviePy compositing.")
+                    return None
+                image_inputs.append(image_path)
+                image_label = f"img{index}"
+                chain.append(f"[{len(image_inputs)}:v]scale=-2:{int(overlay_info.get('height', 100))}[{image_label}]") # Default height for images
+                chain.append(f"[{current_label}][{image_label}]overlay=x={x_expr}:y={y_expr}:{enable}[{next_label}]")
+                self.logger.debug(f"Added image overlay: '{image_path}'")
+            else:
+                continue
+            current_label = next_label
+
+        chain.append(f"[{current_label}]null[vout]")
+        return ";".join(chain), image_inputs
+
+    def _build_overlay_clip(self, overlay_info: Dict[str, Any], font_path: Optional[Path], default_end_time: float):
+        """
+        Builds one positioned and timed text/image overlay clip for _compose_overlay_clip,
+        or returns None for an overlay that has nothing to draw.
+        """
+        overlay_text = overlay_info.get("text")
+        overlay_image_path = overlay_info.get("image_path")
+        start_time = overlay_info.get("start_time", 0)
+        end_time = overlay_info.get("end_time", default_end_time)
+        if overlay_info.get("duration"):
+            end_time = start_time + overlay_info["duration"]
+        position = (
+            overlay_info.get("position_x", "center"), # "center" or pixel value
+            overlay_info.get("position_y", "center") # "center" or pixel value
+        )
+
+        if overlay_text:
+            text_clip_key = (
+                overlay_text,
+                str(font_path) if self._is_usable_font_file(font_path) else None, # None: Pillow's default font
+                overlay_info.get("font_size", 50),
+                overlay_info.get("color", "white"),
+                overlay_info.get("stroke_color", None),
+                overlay_info.get("stroke_width", 0),
+                overlay_info.get("bg_color", None)
+            )
+            # Every render worker composes its own clip; the text is only rasterized once.
+            # with_position/with_start/with_end below return copies, so the cached clip is never modified.
+            overlay_clip = self._text_clip_cache.get(text_clip_key)
+            if overlay_clip is None:
+                text, font, font_size, color, stroke_color, stroke_width, bg_color = text_clip_key
+                overlay_clip = TextClip(
+                    font=font, text=text, font_size=font_size, color=color,
+                    stroke_color=stroke_color, stroke_width=stroke_width, bg_color=bg_color
+                )
+                self._text_clip_cache[text_clip_key] = overlay_clip
+            self.logger.debug(f"Added text overlay: '{overlay_text}'")
+        elif overlay_image_path:
+            image_path = _resolve_overlay_image(overlay_image_path)
+            if image_path is None:
+                self.logger.warning(f"Overlay image not found: {overlay_image_path}")
+                return None
+            overlay_clip = ImageClip(str(image_path)).resized(height=overlay_info.get("height", 100)) # Default height for images
+            self.logger.debug(f"Added image overlay: '{overlay_image_path}'")
+        else:
+            return None
+        return overlay_clip.with_position(position).with_start(start_time).with_end(end_time)
+
+    def _compose_overlay_clip(self, video_source: Path, overlays_data: List[Dict[str, Any]]) -> VideoFileClip:
+        """
+        Opens video_source and composites the text/image overlays over it with MoviePy.
+        All overlays go into a single CompositeVideoClip instead of nesting one composite per overlay.
+        Each call opens its own reader, so separate calls can render frames concurrently.
+        The overlay clips are independent (image reads, text rasterization), so they are built on a
+        small thread pool.
+        """
+        # Video only: FFmpeg muxes the audio from its own file, so MoviePy never needs an audio reader
+        base_clip = VideoFileClip(str(video_source), audio=False)
+        try:
+            # Fonts are resolved up front on this thread; the font manager's cache is not thread-safe
+            font_paths = [
+                self.font_manager.get_font_path(overlay_info.get("font_name", "Arial")) if overlay_info.get("text") else None
+                for overlay_info in overlays_data
+            ]
+            build_overlay = functools.partial(self._build_overlay_clip, default_end_time=base_clip.duration)
+            if len(overlays_data) > 1:
+                with ThreadPoolExecutor(max_workers=min(OVERLAY_BUILD_MAX_WORKERS, len(overlays_data)),
+                                        thread_name_prefix="social_media_overlay") as executor:
+                    built_clips = list(executor.map(build_overlay, overlays_data, font_paths))
+            else:
+                built_clips = [build_overlay(overlay_info, font_path) for overlay_info, font_path in zip(overlays_data, font_paths)]
+            overlay_clips = [overlay_clip for overlay_clip in built_clips if overlay_clip is not None]
+
+            if not overlay_clips:
+                return base_clip
+            return CompositeVideoClip([base_clip, *overlay_clips])
+        except Exception:
+            base_clip.close()
+            raise
+
+    @staticmethod
+    def _close_composed_clip(clip: VideoFileClip):
+        """Closes a clip from _compose_overlay_clip; a composite does not close the clips it layers itself."""
+        for layer in getattr(clip, "clips", []):
+            layer.close()
+        clip.close()
+
+    def _export_clip_via_ffmpeg_pipe(self, clip: VideoFileClip, output_path: Path, audio_path: Optional[Path],
+                                     x264_preset: str = "faster",
+                                     clip_factory: Optional[Callable[[], VideoFileClip]] = None,
+                                     preview: bool = False) -> Tuple[bool, str]:
+        """
+        Encodes a MoviePy clip by writing its rendered RGB frames to an FFmpeg process over stdin.
+        Audio is muxed by FFmpeg directly from audio_path (no audio if None).
+        Uses a hardware H.264 encoder when available; if it fails, the clip is rendered again into libx264.
+        If clip_factory is given, it must build an equivalent clip; frames are then rendered on several threads.
+        """
+        hardware_encoder = self._get_hardware_h264_encoder()
+        if hardware_encoder:
+            success, msg = self._pipe_clip_to_ffmpeg(
+                clip, output_path, audio_path, ["-c:v", hardware_encoder, *HARDWARE_H264_ENCODERS[hardware_encoder]],
+                f"piped final export ({hardware_encoder})", clip_factory
+            )
+            if success:
+                return success, msg
+            self._disable_hardware_encoder("piped final export")
+        return self._pipe_clip_to_ffmpeg(
+            clip, output_path, audio_path,
+            ["-c:v", "libx264", *self._get_x264_args(x264_preset, preview), "-threads", str(X264_THREADS)],
+            "piped final export", clip_factory
+        )
+
+    def _pipe_clip_to_ffmpeg(self, clip: VideoFileClip, output_path: Path, audio_path: Optional[Path],
+                             video_codec_args: List[str], description: str,
+                             clip_factory: Optional[Callable[[], VideoFileClip]] = None) -> Tuple[bool, str]:
+        """Runs one rawvideo-over-stdin FFmpeg encode of clip with the given video codec arguments."""
+        width, height = clip.size
+        fps = clip.fps or 30
+        audio_args = ["-an"]
+        audio_input_args = []
+        if audio_path:
+            audio_input_args = ["-i", str(audio_path)]
+            audio_args = ["-map", "0:v:0", "-map", "1:a:0", *self._get_audio_codec_args(audio_path), "-shortest"]
+        cmd_export = [
+            self.ffmpeg_binary, "-v", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "pipe:0",
+            *audio_input_args,
+            *video_codec_args,
+            *MP4_DELIVERY_ARGS,
+            *audio_args,
+            "-y", str(output_path)
+        ]
+        self.logger.info(f"Executing FFmpeg command for {description}: {' '.join(cmd_export)}")
+        try:
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            # stderr goes to a temp file so a chatty FFmpeg can never block on a full pipe while we write frames
+            with tempfile.TemporaryFile() as stderr_file:
+                process = subprocess.Popen(cmd_export, stdin=subprocess.PIPE, stderr=stderr_file, creationflags=creationflags)
+                try:
+                    if clip_factory:
+                        frames = self._iter_frames_parallel(clip, clip_factory, fps)
+                    else:
+                        frames = clip.iter_frames(fps=fps, dtype="uint8")
+                    for frame in frames:
+                        # Write straight from the frame's buffer; tobytes() would copy every frame first.
+                        # ascontiguousarray is a no-op for the usual C-contiguous frames.
+                        process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+                except BrokenPipeError:
+                    pass # FFmpeg exited early; its exit code and stderr below say why
+                finally:
+                    if clip_factory:
+                        frames.close() # Stops and joins the render workers
+                    try:
+                        process.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                    process.wait()
+                if process.returncode != 0:
+                    stderr_file.seek(0)
+                    stderr_text = stderr_file.read().decode('utf-8', errors='replace')
+                    self.logger.error(f"FFmpeg command failed for {description}. Exit code: {process.returncode}")
+                    self.logger.error(f"FFmpeg STDERR: {stderr_text}")
+                    return False, f"FFmpeg command failed: {stderr_text}"
+            self.logger.info(f"FFmpeg command for {description} completed successfully.")
+            return True, "Success"
+        except FileNotFoundError:
+            self.logger.critical("FFmpeg executable not found. Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            return False, "FFmpeg not found. Please install it and add to PATH."
+
+    def _iter_frames_parallel(self, clip: VideoFileClip, clip_factory: Callable[[], VideoFileClip],
+                              fps: float) -> Iterator[np.ndarray]:
+        """
+        Yields the same uint8 frames as clip.iter_frames(fps=fps), in order, rendered by a pool of threads.
+        MoviePy readers are not thread-safe, so every worker beyond the first renders from its own clip
+        built by clip_factory. The timeline is cut into segments dealt round-robin to the workers, and
+        each worker feeds a small bounded queue, so the consumer reads segment k from queue k % workers
+        without any reordering and at most a few frames per worker are held in memory.
+        """
+        frame_count = int(clip.duration * fps)
+        segment_frames = max(1, int(PIPE_RENDER_SEGMENT_SECONDS * fps))
+        segments = [(start, min(start + segment_frames, frame_count))
+                    for start in range(0, frame_count, segment_frames)]
+        worker_count = min(os.cpu_count() or 1, PIPE_RENDER_MAX_WORKERS, len(segments))
+        if worker_count < 2:
+            yield from clip.iter_frames(fps=fps, dtype="uint8")
+            return
+
+        frame_queues = [queue.Queue(maxsize=PIPE_RENDER_QUEUE_FRAMES) for _ in range(worker_count)]
+        stop_event = threading.Event()
+
+        def put(frame_queue: queue.Queue, item: Any) -> bool:
+            while not stop_event.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def render_segments(worker_index: int) -> None:
+            frame_queue = frame_queues[worker_index]
+            worker_clip = None
+            try:
+                worker_clip = clip if worker_index == 0 else clip_factory()
+                for start, end in segments[worker_index::worker_count]:
+                    for frame_index in range(start, end):
+                        frame = worker_clip.get_frame(frame_index / fps).astype("uint8", copy=False)
+                        if not put(frame_queue, frame):
+                            return
+            except Exception as e:
+                put(frame_queue, e) # Re-raised in order by the consumer
+            finally:
+                if worker_clip is not None and worker_clip is not clip:
+                    self._close_composed_clip(worker_clip)
+
+        self.logger.debug(f"Rendering {frame_count} frames on {worker_count} threads in {len(segments)} segments.")
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            for worker_index in range(worker_count):
+                executor.submit(render_segments, worker_index)
+            try:
+                for segment_index, (start, end) in enumerate(segments):
+                    frame_queue = frame_queues[segment_index % worker_count]
+                    for _ in range(start, end):
+                        item = frame_queue.get()
+                        if isinstance(item, Exception):
+                            raise item
+                        yield item
+            finally:
+                stop_event.set() # Workers blocked on a full queue give up; the executor then joins them
+
     def _get_main_content_bounding_box(self, video_path: Path) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Returns the main content bounding box of a video, reusing the result of a previous
+        analysis of the same unchanged file when available.
+        """
+        try:
+            stat_result = video_path.stat()
+            cache_key = (str(video_path.resolve()), stat_result.st_size, stat_result.st_mtime_ns)
+        except OSError:
+            return self._detect_main_content_bounding_box(video_path)
+
+        with _content_box_cache_lock:
+            if cache_key in _CONTENT_BOX_CACHE:
+                _CONTENT_BOX_CACHE.move_to_end(cache_key)
+                self.logger.info(f"Using cached content bounding box for: {video_path}")
+                return _CONTENT_BOX_CACHE[cache_key]
+
+        bounding_box = self._detect_main_content_bounding_box(video_path)
+        with _content_box_cache_lock:
+            _CONTENT_BOX_CACHE[cache_key] = bounding_box
+            if len(_CONTENT_BOX_CACHE) > _CONTENT_BOX_CACHE_SIZE:
+                _CONTENT_BOX_CACHE.popitem(last=False) # Evict least recently used
+        return bounding_box
+
+    def _iter_sampled_frames(self, cap: cv2.VideoCapture, sample_interval: int,
+                             downscale: int) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+        """
+        Yields ((height, width), grayscale frame downscaled by downscale) for every sample_interval-th frame of cap.
+        Decoding and downscaling run on a background thread a few samples ahead of the consumer, so
+        the decode of the next sample overlaps the analysis of the current one (OpenCV releases the GIL).
+        Skipped frames are advanced with grab(), which demuxes/decodes but skips the BGR conversion and
+        copy that read() performs. (Seeking with CAP_PROP_POS_FRAMES would re-decode from the previous
+        keyframe on long-GOP video.)
+        The decoded, downscaled and grayscale frames are written into preallocated buffers; yielded
+        frames come from a ring large enough that none is reused while it is queued or being analyzed.
+        """
+        frame_queue = queue.Queue(maxsize=4)
+        stop_event = threading.Event()
+        end_of_video = object()
+
+        def put(item: Any) -> bool:
+            while not stop_event.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decode_samples() -> None:
+            frame = small_frame = None
+            gray_ring = []
+            try:
+                while not stop_event.is_set():
+                    ret, frame = cap.read(frame) # Decodes into the previous frame's buffer
+                    if not ret:
+                        break
+                    frame_height, frame_width = frame.shape[:2]
+                    small_size = (max(1, frame_width // downscale), max(1, frame_height // downscale))
+                    if small_frame is None:
+                        small_frame = np.empty((small_size[1], small_size[0], 3), np.uint8)
+                        # Queued frames + the one being analyzed + the one being filled
+                        gray_ring = [np.empty((small_size[1], small_size[0]), np.uint8) for _ in range(frame_queue.maxsize + 2)]
+                    gray_frame = gray_ring[0]
+                    gray_ring.append(gray_ring.pop(0))
+                    cv2.resize(frame, small_size, dst=small_frame, interpolation=cv2.INTER_AREA)
+                    # MOG2 on one channel touches a third of the bytes of the BGR frame
+                    cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY, dst=gray_frame)
+                    if not put(((frame_height, frame_width), gray_frame)):
+                        return
+                    # Skip ahead to the next sampled frame
+                    for _ in range(sample_interval - 1):
+                        if not cap.grab():
+                            break
+                    else:
+                        continue
+                    break
+                put(end_of_video)
+            except Exception as e:
+                put(e) # Re-raised by the consumer
+
+        decoder = threading.Thread(target=decode_samples, name="content_box_decoder", daemon=True)
+        decoder.start()
+        try:
+            while True:
+                item = frame_queue.get()
+                if item is end_of_video:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop_event.set()
+            decoder.join()
+
+    def _detect_main_content_bounding_box(self, video_path: Path) -> Optional[Tuple[int, int, int, int]]:
         """
         Analyzes video frames to find a bounding box that contains the most significant
         motion or visual content, to assist in intelligent cropping.
@@ -108,49 +890,74 @@ class SocialMediaVideoProcessor:
             self.logger.error(f"Could not open video file for analysis: {video_path}")
             return None
 
+        # Frames are analyzed at 1/downscale resolution; the box is coarse anyway and
+        # scaled back to full resolution at the end.
+        downscale = 4
+        # Only every sample_interval-th frame is analyzed, see _iter_sampled_frames
+        sample_interval = 50
         min_x, min_y = float('inf'), float('inf')
         max_x, max_y = float('-inf'), float('-inf')
+        frame_width, frame_height = 0, 0
+        # Stop early once the box has settled: after min_samples sampled frames, if it hasn't
+        # grown for stable_samples consecutive samples (typical for static-camera content).
+        min_samples = 20
+        stable_samples = 5
+        last_growth_sample = 0
+
+        # Main content is whatever moves: a background model learned over the sampled frames
+        # ignores static backgrounds and letterboxing, which a plain brightness threshold does not.
+        bg_subtractor = cv2.createBackgroundSubtractorMOG2(history=100, varThreshold=25, detectShadows=False)
+
+        # With an OpenCL device, OpenCV's transparent API runs MOG2/median on it when frames
+        # are wrapped in UMat; only the two 1-D extent profiles are copied back per sample.
+        use_opencl = cv2.ocl.haveOpenCL()
+        if use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            self.logger.debug("OpenCL available; content analysis runs through cv2.UMat.")
 
         frame_count = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Convert to grayscale for motion detection or content analysis
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Apply threshold to find significant pixels (adjust threshold as needed)
-            # This can be improved with background subtraction or more advanced techniques
-            _, thresh = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY) # Simple threshold
-            
-            # Find contours
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        sampled_frames = self._iter_sampled_frames(cap, sample_interval, downscale)
+        try:
+            for (frame_height, frame_width), small_frame in sampled_frames:
+                foreground_mask = bg_subtractor.apply(cv2.UMat(small_frame) if use_opencl else small_frame)
+                # Remove isolated noise pixels so they don't stretch the box
+                foreground_mask = cv2.medianBlur(foreground_mask, 3)
             
-            if contours:
-                # Combine all bounding boxes of detected contours
-                x_coords = []
-                y_coords = []
-                for contour in contours:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    x_coords.extend([x, x + w])
-                    y_coords.extend([y, y + h])
-                
-                if x_coords and y_coords:
-                    min_x = min(min_x, min(x_coords))
-                    min_y = min(min_y, min(y_coords))
-                    max_x = max(max_x, max(x_coords))
-                    max_y = max(max_y, max(y_coords))
-            frame_count += 1
-            if frame_count % 50 == 0: # Process every 50th frame for speed
-                self.logger.debug(f"Analyzed {frame_count} frames for content box...")
-        
-        cap.release()
+                # The outer extent of all foreground pixels is the first/last non-empty column and row.
+                # The first frame only seeds the background model (everything would be foreground).
+                content_columns = content_rows = np.empty(0)
+                if frame_count:
+                    column_profile = cv2.reduce(foreground_mask, 0, cv2.REDUCE_MAX)
+                    row_profile = cv2.reduce(foreground_mask, 1, cv2.REDUCE_MAX)
+                    if use_opencl:
+                        column_profile, row_profile = column_profile.get(), row_profile.get()
+                    content_columns = np.flatnonzero(column_profile)
+                    content_rows = np.flatnonzero(row_profile)
+                if content_columns.size:
+                    previous_box = (min_x, min_y, max_x, max_y)
+                    min_x = min(min_x, int(content_columns[0]))
+                    max_x = max(max_x, int(content_columns[-1]) + 1)
+                    min_y = min(min_y, int(content_rows[0]))
+                    max_y = max(max_y, int(content_rows[-1]) + 1)
+                    if (min_x, min_y, max_x, max_y) != previous_box:
+                        last_growth_sample = frame_count
+                frame_count += 1
+                if frame_count >= min_samples and frame_count - last_growth_sample > stable_samples:
+                    self.logger.debug(f"Content box stable after {frame_count} sampled frames; stopping analysis.")
+                    break
+                if frame_count % 50 == 0:
+                    self.logger.debug(f"Analyzed {frame_count} sampled frames for content box...")
+        finally:
+            sampled_frames.close() # Stops and joins the decoder thread before the capture is released
+            cap.release()
 
         if min_x == float('inf') or max_x == float('-inf'):
-            self.logger.warning("No significant content detected for cropping. Returning None.")
+            self.logger.warning("No moving content detected for cropping. Returning None.")
             return None # No content detected
 
+        # Scale the box back to full resolution
+        min_x, min_y = min_x * downscale, min_y * downscale
+        max_x, max_y = min(max_x * downscale, frame_width), min(max_y * downscale, frame_height)
         content_width = max_x - min_x
         content_height = max_y - min_y
         
@@ -158,74 +965,115 @@ class SocialMediaVideoProcessor:
         return (min_x, min_y, content_width, content_height)
 
 
+    def _recognize_pcm_window(self, model: Model, pcm: bytes, byte_start: int, byte_end: int, owned_start_s: float, owned_end_s: float) -> List[Dict[str, Any]]:
+        """
+        Runs a dedicated KaldiRecognizer over pcm[byte_start:byte_end] (16 kHz mono 16-bit PCM).
+        Only words starting inside [owned_start_s, owned_end_s) are returned, so the overlap
+        shared with neighbouring windows is reported exactly once.
+        """
+        recognizer = KaldiRecognizer(model, 16000) # 16kHz sample rate
+        recognizer.SetWords(True) # Word-level timestamps are needed for subtitle timing
+
+        results = []
+        for offset in range(byte_start, byte_end, VOSK_CHUNK_BYTES): # Feed in ~2 s slices
+            if recognizer.AcceptWaveform(pcm[offset:min(offset + VOSK_CHUNK_BYTES, byte_end)]):
+                results.append(json.loads(recognizer.Result()))
+        # Get any remaining result after the loop
+        results.append(json.loads(recognizer.FinalResult()))
+
+        window_start_s = byte_start / VOSK_BYTES_PER_SECOND
+        words_info = []
+        for result in results:
+            words_info.extend([
+                {
+                    "text": word_data["word"],
+                    "start": window_start_s + word_data["start"],
+                    "end": window_start_s + word_data["end"]
+                }
+                for word_data in result.get("result", [])
+                if owned_start_s <= window_start_s + word_data["start"] < owned_end_s
+            ])
+        return words_info
+
     def _transcribe_audio_vosk(self, audio_filepath: Path) -> List[Dict[str, Any]]:
         """
         Transcribes audio using the offline Vosk speech recognition engine.
         Returns a list of dictionaries with 'text', 'start', and 'end' for each word.
+        The audio is split into overlapping windows that are recognized in parallel, each
+        with its own KaldiRecognizer sharing one loaded Model (Vosk releases the GIL while decoding).
         
         Args:
-            audio_filepath (Path): Path to the audio file (preferably WAV, 16kHz, mono).
+            audio_filepath (Path): Path to the audio file (any format FFmpeg can decode).
             
         Returns:
             List[Dict[str, Any]]: A list of word-level transcription results.
         """
         self.logger.info(f"Transcribing audio with Vosk from: {audio_filepath}")
         
-        # Ensure Vosk model is loaded
-        if self.vosk_recognizer is None:
-            if not self.vosk_model_path.exists():
-                self.logger.error(f"Vosk model not found at: {self.vosk_model_path}")
-                raise SocialMediaVideoProcessorError(
-                    f"Vosk model not found. Please ensure the Vosk model "
-                    f"'{self.vosk_model_path.name}' is downloaded in '{self.vosk_model_path.parent}'."
-                )
-            # set_log_level(-1) # Removed as it's causing ImportError
-            self.vosk_recognizer = KaldiRecognizer(Model(str(self.vosk_model_path)), 16000) # 16kHz sample rate
+        # Ensure Vosk model is loaded (cached at module level across instances)
+        if not self.vosk_model_path.exists():
+            self.logger.error(f"Vosk model not found at: {self.vosk_model_path}")
+            raise SocialMediaVideoProcessorError(
+                f"Vosk model not found. Please ensure the Vosk model "
+                f"'{self.vosk_model_path.name}' is downloaded in '{self.vosk_model_path.parent}'."
+            )
+        # set_log_level(-1) # Removed as it's causing ImportError
+        vosk_model = _get_vosk_model(str(self.vosk_model_path))
 
-        words_info = []
-        
-        # Convert audio to a format suitable for Vosk (16kHz, mono, WAV)
-        temp_mono_wav = audio_filepath.parent / f"{audio_filepath.stem}_16khz_mono.wav"
-        
+        # Decode the audio straight into memory in the raw format Vosk consumes
+        # (16kHz, mono, signed 16-bit PCM, no header) instead of round-tripping through a temp file
         cmd_convert_audio = [
-            "ffmpeg",
+            self.ffmpeg_binary,
             "-i", str(audio_filepath),
+            "-vn",           # Ignore any video stream
             "-ac", "1",      # Convert to mono
             "-ar", "16000",  # Resample to 16kHz
-            "-f", "wav",     # Output WAV format
-            "-y", str(temp_mono_wav)
+            "-f", "s16le",   # Raw PCM, so windows can be sliced without parsing a header
+            "pipe:1"
         ]
-        success, msg = self._run_ffmpeg_command(cmd_convert_audio, "audio conversion for Vosk")
-        if not success:
-            raise SocialMediaVideoProcessorError(f"Failed to convert audio for Vosk transcription: {msg}")
-
+        self.logger.info(f"Executing FFmpeg command for audio conversion for Vosk: {' '.join(cmd_convert_audio)}")
         try:
-            with open(temp_mono_wav, "rb") as wf:
-                while True:
-                    data = wf.read(4000) # Read in chunks
-                    if len(data) == 0:
-                        break
-                    if self.vosk_recognizer.AcceptWaveform(data):
-                        result = json.loads(self.vosk_recognizer.Result())
-                        if "result" in result:
-                            for word_data in result["result"]:
-                                words_info.append({
-                                    "text": word_data["word"],
-                                    "start": word_data["start"],
-                                    "end": word_data["end"]
-                                })
-            # Get any remaining result after the loop
-            final_result = json.loads(self.vosk_recognizer.FinalResult())
-            if "result" in final_result:
-                for word_data in final_result["result"]:
-                    words_info.append({
-                        "text": word_data["word"],
-                        "start": word_data["start"],
-                        "end": word_data["end"]
-                    })
-        finally:
-            if temp_mono_wav.exists():
-                os.remove(temp_mono_wav) # Clean up temporary WAV file
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            process = subprocess.Popen(
+                cmd_convert_audio, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                bufsize=1 << 20, creationflags=creationflags
+            )
+            pcm, stderr_output = process.communicate()
+        except FileNotFoundError:
+            self.logger.critical("FFmpeg executable not found. Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            raise SocialMediaVideoProcessorError("Failed to convert audio for Vosk transcription: FFmpeg not found. Please install it and add to PATH.")
+        if process.returncode != 0:
+            stderr_text = stderr_output.decode('utf-8', errors='replace')
+            self.logger.error(f"FFmpeg command failed for audio conversion for Vosk. Exit code: {process.returncode}")
+            self.logger.error(f"FFmpeg STDERR: {stderr_text}")
+            raise SocialMediaVideoProcessorError(f"Failed to convert audio for Vosk transcription: FFmpeg command failed: {stderr_text}")
+
+        words_info = []
+        if not pcm:
+            self.logger.warning("Converted audio is empty; nothing to transcribe.")
+            return words_info
+
+        # Split into windows of VOSK_WINDOW_SECONDS, each decoded with VOSK_WINDOW_OVERLAP_SECONDS
+        # of extra audio on both sides so words cut by a window edge are seen whole by one window.
+        window_bytes = VOSK_WINDOW_SECONDS * VOSK_BYTES_PER_SECOND
+        overlap_bytes = VOSK_WINDOW_OVERLAP_SECONDS * VOSK_BYTES_PER_SECOND
+        window_jobs = []
+        for owned_start in range(0, len(pcm), window_bytes):
+            is_last_window = owned_start + window_bytes >= len(pcm)
+            window_jobs.append((
+                max(0, owned_start - overlap_bytes),
+                min(len(pcm), owned_start + window_bytes + overlap_bytes),
+                owned_start / VOSK_BYTES_PER_SECOND,
+                float('inf') if is_last_window else (owned_start + window_bytes) / VOSK_BYTES_PER_SECOND
+            ))
+
+        max_workers = min(len(window_jobs), os.cpu_count() or 1)
+        self.logger.info(f"Recognizing {len(window_jobs)} audio window(s) with {max_workers} worker(s).")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._recognize_pcm_window, vosk_model, pcm, *job) for job in window_jobs]
+            for future in futures:
+                words_info.extend(future.result())
+        words_info.sort(key=lambda word: word["start"])
             
         self.logger.info(f"Vosk transcription complete. Found {len(words_info)} words.")
         return words_info
@@ -241,53 +1089,216 @@ class SocialMediaVideoProcessor:
         Returns:
             str: The formatted SRT content.
         """
-        srt_content = []
-        subtitle_number = 1
-        
+        def format_srt_time(total_milliseconds: int) -> str:
+            seconds, milliseconds = divmod(total_milliseconds, 1000)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+
         if not words_info:
             return ""
 
-        current_line_words = []
+        starts = np.fromiter((w["start"] for w in words_info), dtype=np.float64, count=len(words_info))
+        ends = np.fromiter((w["end"] for w in words_info), dtype=np.float64, count=len(words_info))
+        texts = [w["text"] for w in words_info]
+        line_starts, line_ends = _subtitle_line_bounds(starts, ends, words_per_line, SUBTITLE_PAUSE_SECONDS)
+        # Round once to integer milliseconds so carries propagate (59.9996 s -> 00:01:00,000)
+        start_ms = np.rint(starts[line_starts] * 1000).astype(np.int64).tolist()
+        end_ms = np.rint(ends[line_ends - 1] * 1000).astype(np.int64).tolist()
+
+        srt_content = []
+        for subtitle_number, (line_start, line_end) in enumerate(zip(line_starts.tolist(), line_ends.tolist()), start=1):
+            srt_content.append(str(subtitle_number))
+            srt_content.append(f"{format_srt_time(start_ms[subtitle_number - 1])} --> {format_srt_time(end_ms[subtitle_number - 1])}")
+            srt_content.append(" ".join(texts[line_start:line_end]))
+            srt_content.append("") # Empty line separates entries
+
+        return "\n".join(srt_content)
+
+    @staticmethod
+    def _rgb_hex_to_ass_color(hex_color: str, default: str) -> str:
+        """Converts #RRGGBB to ASS's &HAABBGGRR format (alpha 00 = opaque); returns default if unparsable."""
+        try:
+            rgb = int(hex_color.lstrip('#'), 16)
+        except (AttributeError, ValueError):
+            return default
+        return f"&H00{rgb & 0xFF:02X}{(rgb >> 8) & 0xFF:02X}{(rgb >> 16) & 0xFF:02X}"
+
+    def _get_subtitle_style(self, processing_options: Dict[str, Any], font_path: Path, target_height: int) -> Dict[str, Any]:
+        """
+        Builds the ASS "Default" style fields for the subtitle options, cached per distinct
+        combination of the options that affect it.
+        """
+        style_key = (
+            str(font_path),
+            processing_options.get("subtitle_font_size", 40),
+            processing_options.get("subtitle_color", "#FFFFFF"),
+            processing_options.get("subtitle_stroke_color", "#000000"),
+            processing_options.get("subtitle_stroke_width", 2),
+            processing_options.get("subtitle_font_position_y", 0.85),
+            target_height
+        )
+        subtitle_style = self._subtitle_style_cache.get(style_key)
+        if subtitle_style is None:
+            font_path_str, font_size, color, stroke_color, stroke_width, position_y, _ = style_key
+            subtitle_style = {
+                "Fontname": Path(font_path_str).stem, # Use stem if font path is too complex
+                "Fontsize": font_size,
+                "PrimaryColour": self._rgb_hex_to_ass_color(color, "&H00FFFFFF"),
+                "OutlineColour": self._rgb_hex_to_ass_color(stroke_color, "&H00000000"),
+                "Outline": stroke_width,
+                "Alignment": 2, # Bottom center
+                "MarginV": int(target_height * (1.0 - position_y)) # Vertical margin from bottom
+            }
+            self._subtitle_style_cache[style_key] = subtitle_style
+        return subtitle_style
+
+    @staticmethod
+    def _escape_filter_path(path: Path) -> str:
+        """Quotes a file path for use as an FFmpeg filter option value (handles Windows drive colons)."""
+        return f"'{str(path).translate(_FILTER_PATH_ESCAPE)}'"
+
+    @staticmethod
+    def _escape_filter_value(value: Any) -> str:
+        """Quotes a user-supplied value (e.g. a colour) for use as an FFmpeg filter option value."""
+        return f"'{str(value).translate(_FILTER_VALUE_ESCAPE)}'"
+
+    def _write_ass_subtitles(self, srt_path: Path, ass_path: Path, style: Dict[str, Any], play_res_x: int, play_res_y: int):
+        """
+        Converts an SRT file into an ASS file with a single "Default" style.
+        PlayResX/PlayResY match the output resolution, so margins and font sizes are in output pixels.
         
-        for i, word_data in enumerate(words_info):
-            current_line_words.append(word_data)
+        Args:
+            srt_path (Path): The SRT file to convert.
+            ass_path (Path): Where to write the ASS file.
+            style (Dict[str, Any]): ASS style fields overriding the defaults (e.g. Fontname, PrimaryColour, MarginV).
+            play_res_x (int): Script width in pixels.
+            play_res_y (int): Script height in pixels.
+        """
+        style_fields = {
+            "Name": "Default", "Fontname": "Arial", "Fontsize": 40,
+            "PrimaryColour": "&H00FFFFFF", "SecondaryColour": "&H000000FF",
+            "OutlineColour": "&H00000000", "BackColour": "&H00000000",
+            "Bold": 0, "Italic": 0, "Underline": 0, "StrikeOut": 0,
+            "ScaleX": 100, "ScaleY": 100, "Spacing": 0, "Angle": 0,
+            "BorderStyle": 1, "Outline": 2, "Shadow": 0, "Alignment": 2,
+            "MarginL": 10, "MarginR": 10, "MarginV": 10, "Encoding": 1
+        }
+        style_fields.update(style)
+
+        def to_ass_time(srt_time: str) -> str:
+            # HH:MM:SS,mmm -> H:MM:SS.cc
+            hms, milliseconds = srt_time.strip().split(",")
+            hours, minutes, seconds = hms.split(":")
+            return f"{int(hours)}:{minutes}:{seconds}.{int(milliseconds) // 10:02}"
+
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {play_res_x}",
+            f"PlayResY: {play_res_y}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: " + ", ".join(style_fields.keys()),
+            "Style: " + ",".join(str(value) for value in style_fields.values()),
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+        ]
+        with open(srt_path, "r", encoding="utf-8") as f:
+            srt_blocks = f.read().strip().split("\n\n")
+        for block in srt_blocks:
+            block_lines = block.strip().splitlines()
+            if len(block_lines) < 3 or "-->" not in block_lines[1]:
+                continue
+            start_time, end_time = block_lines[1].split("-->")
+            text = "\\N".join(block_lines[2:]).replace("{", "\\{")
+            lines.append(f"Dialogue: 0,{to_ass_time(start_time)},{to_ass_time(end_time)},Default,,0,0,0,,{text}")
+
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.logger.info(f"ASS subtitles written to: {ass_path}")
+
+    def _prepare_audio_and_subtitles(self, input_filepath: Path, temp_audio_path: Path, temp_enhanced_audio_path: Path,
+                                     temp_subtitles_file: Path, processing_options: Dict[str, Any],
+                                     has_audio: bool) -> Tuple[Optional[Path], Optional[Path]]:
+        """
+        Audio branch of process_social_media_video: extracts the audio track, optionally enhances it,
+        and transcribes it into an SRT file when subtitles are requested.
+        Independent of the video filtergraph, so it can run concurrently with it.
+        
+        Returns:
+            Tuple[Optional[Path], Optional[Path]]: (audio file for the final video or None,
+                                                   subtitle font path or None if no subtitles were written).
+        """
+        font_path = None
+        # Step 1/2: Audio enhancement needs a 48kHz working copy; without it the source itself is used.
+        # Vosk decodes straight to 16kHz from whichever file it is given and MoviePy reads the final
+        # audio from the same file, so no intermediate WAV (and no second resample) is needed.
+        audio_for_transcription_path = None
+        if not has_audio:
+            self.logger.warning("Input video has no audio stream. Proceeding without audio processing/transcription.")
+        elif processing_options.get("apply_auto_audio_enhancement"):
+            self.logger.info("Extracting audio from video for processing...")
+            self._update_progress(10, "Extracting audio...")
+            cmd_extract_audio = [
+                self.ffmpeg_binary,
+                "-i", str(input_filepath),
+                "-map", "0:a:0", # Only the first audio stream is demuxed and decoded
+                "-vn", "-acodec", "pcm_s16le", # Extract as PCM WAV for high quality and compatibility
+                "-ar", "48000", # Desired sample rate for processing
+                "-ac", "1", # Mono channel
+                "-y", str(temp_audio_path)
+            ]
+            success, msg = self._run_ffmpeg_command(cmd_extract_audio, "audio extraction")
+            if not success:
+                self.logger.warning(f"Audio extraction failed: {msg}. Proceeding without audio processing/transcription.")
+            else:
+                self.logger.info("Applying automatic audio enhancements.")
+                self._update_progress(20, "Applying audio enhancements...")
+                success, msg = self.audio_processor.process_audio_file(
+                    temp_audio_path, temp_enhanced_audio_path, False, # Do not delete original temp_audio_path
+                    progress_callback_func=lambda p, m: self._update_progress(int(20 + p * 0.1), m) # Scale progress
+                )
+                if not success:
+                    raise SocialMediaVideoProcessorError(f"Audio enhancement failed: {msg}")
+                self.logger.info("Audio enhancements applied.")
+                audio_for_transcription_path = temp_enhanced_audio_path
+                temp_audio_path.unlink(missing_ok=True) # Raw extraction is no longer needed
+        else:
+            self.logger.info("Skipping automatic audio enhancements.")
+            audio_for_transcription_path = input_filepath # Use the source audio as-is
+
+        # Step 3: Generate Subtitles (if enabled)
+        if processing_options.get("generate_subtitles") and audio_for_transcription_path and audio_for_transcription_path.exists():
+            self.logger.info("Generating subtitles from audio.")
+            self._update_progress(30, "Transcribing audio for subtitles...")
             
-            # Check if we should break the line:
-            # 1. If we reached words_per_line
-            # 2. If it's the last word
-            # 3. If the gap to the next word is large (e.g., > 0.5 seconds) - helps with natural pauses
-            if (len(current_line_words) == words_per_line or
-                i == len(words_info) - 1 or
-                (i + 1 < len(words_info) and (words_info[i+1]["start"] - word_data["end"]) > 0.5)):
-                
-                # Form the text for the current line
-                line_text = " ".join([w["text"] for w in current_line_words])
-                
-                # Determine start and end times for the line
-                start_time_seconds = current_line_words[0]["start"]
-                end_time_seconds = current_line_words[-1]["end"]
+            # Transcribe using Vosk (offline ASR)
+            words_info = self._transcribe_audio_vosk(audio_for_transcription_path)
+            
+            if words_info:
+                words_per_line = processing_options.get("subtitle_words_per_line", 3)
+                srt_content = self._generate_srt_content(words_info, words_per_line)
                 
-                # Format times to SRT format (HH:MM:SS,ms)
-                start_h, start_m, start_s, start_ms = self._split_seconds_to_srt_components(start_time_seconds)
-                end_h, end_m, end_s, end_ms = self._split_seconds_to_srt_components(end_time_seconds)
-
-                srt_content.append(str(subtitle_number))
-                srt_content.append(f"{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> {end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}")
-                srt_content.append(line_text)
-                srt_content.append("") # Empty line separates entries
+                with open(temp_subtitles_file, "w", encoding="utf-8") as f:
+                    f.write(srt_content)
+                self.logger.info(f"SRT subtitles generated to: {temp_subtitles_file}")
 
-                current_line_words = []
-                subtitle_number += 1
-
-        return "\n".join(srt_content)
+                font_name = processing_options.get("default_subtitle_font_name", "Arial")
+                font_path = self.font_manager.get_font_path(font_name) or self.font_manager.get_default_font_path()
+                
+                if not font_path.exists():
+                    self.logger.error(f"Subtitle font not found: {font_path}. Using system default.")
+                    font_path = self.font_manager.get_default_font_path() # Fallback to a guaranteed font
+            else:
+                self.logger.warning("No words transcribed, skipping subtitle generation.")
+        else:
+            self.logger.info("Skipping subtitle generation.")
 
-    def _split_seconds_to_srt_components(self, total_seconds: float) -> Tuple[int, int, int, int]:
-        """Helper to convert total seconds to SRT time format components (H, M, S, MS)."""
-        hours = int(total_seconds // 3600)
-        minutes = int((total_seconds % 3600) // 60)
-        seconds = int(total_seconds % 60)
-        milliseconds = int((total_seconds * 1000) % 1000)
-        return hours, minutes, seconds, milliseconds
+        return audio_for_transcription_path, font_path
 
     def process_social_media_video(
         self,
@@ -320,6 +1331,7 @@ class SocialMediaVideoProcessor:
                                                   - overlays (List[Dict])
                                                   - delete_original_after_processing (bool)
                                                   - target_social_media_resolution (str, e.g., "1080x1920")
+                                                  - preview (bool): fast, low-latency libx264 settings instead of final quality
             progress_callback_func (callable, optional): A function to call with progress updates.
         
         Returns:
@@ -331,6 +1343,7 @@ class SocialMediaVideoProcessor:
 
         self._is_processing = True
         self._external_progress_callback = progress_callback_func
+        self._last_progress = 0
         self.logger.info(f"Starting social media video processing for: {input_filepath}")
         self._update_progress(0, "Initializing social media video processing...")
 
@@ -342,140 +1355,72 @@ class SocialMediaVideoProcessor:
         output_filepath.parent.mkdir(parents=True, exist_ok=True)
 
         temp_dir_prefix = f"creators_toolkit_social_media_{os.getpid()}_"
-        temp_working_dir = Path(tempfile.mkdtemp(prefix=temp_dir_prefix))
-        atexit.register(lambda: shutil.rmtree(temp_working_dir, ignore_errors=True))
+        # Removed in the finally block below as soon as this call ends (not at interpreter exit)
+        temp_dir = tempfile.TemporaryDirectory(prefix=temp_dir_prefix, dir=self._get_temp_parent_dir(input_filepath),
+                                               ignore_cleanup_errors=True)
+        temp_working_dir = Path(temp_dir.name)
         self.logger.info(f"Created temporary working directory: {temp_working_dir}")
 
-        temp_video_path = temp_working_dir / "temp_video.mp4"
         temp_audio_path = temp_working_dir / "temp_audio.wav" # For ASR
         temp_enhanced_audio_path = temp_working_dir / "temp_enhanced_audio.wav"
-        temp_enhanced_video_path = temp_working_dir / "temp_enhanced_video.mp4"
-        temp_cropped_video_path = temp_working_dir / "temp_cropped_video.mp4"
-        temp_final_video_no_subtitles_path = temp_working_dir / "temp_final_video_no_subtitles.mp4"
+        temp_processed_video_path = temp_working_dir / "temp_processed_video.mp4"
         temp_subtitles_file = temp_working_dir / "subtitles.srt"
+        temp_ass_subtitles_file = temp_working_dir / "subtitles.ass"
 
-        video_clip = None
-        audio_clip = None
         final_clip = None
+        audio_future = None
 
         try:
-            # Load video clip using MoviePy to get duration and dimensions
-            self.logger.info(f"Loading video clip to determine properties: {input_filepath}")
+            # Probe duration and dimensions without opening a decoder
+            self.logger.info(f"Probing video properties: {input_filepath}")
             self._update_progress(5, "Analyzing video properties...")
-            video_clip = VideoFileClip(str(input_filepath))
-            original_duration = video_clip.duration
-            original_width, original_height = video_clip.size
-            self.logger.info(f"Video loaded. Duration: {original_duration:.2f}s, Dimensions: {original_width}x{original_height}")
+            original_duration, original_width, original_height, has_audio = self._probe_video_properties(input_filepath)
+            self.logger.info(f"Video probed. Duration: {original_duration:.2f}s, Dimensions: {original_width}x{original_height}")
+
+            target_resolution_str = processing_options.get("target_social_media_resolution", "1080x1920")
+            target_width, target_height = map(int, target_resolution_str.split('x'))
+            # 'faster' is far quicker than 'medium' at a negligible quality/bitrate cost for social media uploads
+            x264_preset = processing_options.get(
+                "x264_preset",
+                self.config.get_setting("processing_parameters.social_media_post_processing.x264_preset", "faster")
+            )
+            preview = processing_options.get("preview", False)
+            if preview:
+                self.logger.info("Preview render: using low-latency libx264 settings.")
+
+            # Steps 1-3 (audio extraction, enhancement, transcription) only need the source file,
+            # so they run on a worker thread while content analysis and the video pass proceed here.
+            audio_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="social_media_audio")
+            audio_future = audio_executor.submit(
+                self._prepare_audio_and_subtitles, input_filepath, temp_audio_path,
+                temp_enhanced_audio_path, temp_subtitles_file, processing_options, has_audio
+            )
+            audio_executor.shutdown(wait=False)
+
+            # Step 4: Build a single FFmpeg filtergraph for every video-side stage.
+            # Enhancement, cropping, scaling and subtitle burn-in all run in one decode/encode
+            # pass instead of writing (and re-reading) an intermediate file per stage.
+            video_filters = []
+            filtered_size = (original_width, original_height) # Frame size at the current end of the filtergraph
 
-            # Step 1: Apply Video Enhancements (if enabled)
+            enhancement_filter = None
             if processing_options.get("apply_auto_video_enhancement"):
                 self.logger.info("Applying automatic video enhancements.")
-                self._update_progress(10, "Applying video enhancements...")
                 # Fetch enhancement parameters from config (or pass custom ones)
                 video_enhance_params = self.config.get_setting("processing_parameters.video_enhancement")
-                success, msg = self.video_enhancer.enhance_video(
-                    input_filepath, temp_enhanced_video_path, video_enhance_params,
-                    progress_callback_func=lambda p, m: self._update_progress(int(10 + p * 0.1), m) # Scale progress
-                )
-                if not success:
-                    raise SocialMediaVideoProcessorError(f"Video enhancement failed: {msg}")
-                self.logger.info("Video enhancements applied.")
-                input_filepath_for_next_step = temp_enhanced_video_path
+                enhancement_filter = self.video_enhancer.build_ffmpeg_filter_string(video_enhance_params or {})
             else:
                 self.logger.info("Skipping automatic video enhancements.")
-                input_filepath_for_next_step = input_filepath
-
-            # Step 2: Extract Audio for processing/transcription
-            self.logger.info("Extracting audio from video for processing...")
-            self._update_progress(20, "Extracting audio...")
-            cmd_extract_audio = [
-                "ffmpeg",
-                "-i", str(input_filepath_for_next_step), # Use enhanced video if applicable
-                "-vn", "-acodec", "pcm_s16le", # Extract as PCM WAV for high quality and compatibility
-                "-ar", "48000", # Desired sample rate for processing
-                "-ac", "1", # Mono channel
-                "-y", str(temp_audio_path)
-            ]
-            success, msg = self._run_ffmpeg_command(cmd_extract_audio, "audio extraction")
-            if not success:
-                self.logger.warning(f"Audio extraction failed: {msg}. Proceeding without audio processing/transcription.")
-                temp_audio_path = None # Mark audio as not available
-
-            # Step 3: Apply Audio Enhancements (if enabled)
-            audio_for_transcription_path = None
-            if temp_audio_path and processing_options.get("apply_auto_audio_enhancement"):
-                self.logger.info("Applying automatic audio enhancements.")
-                self._update_progress(30, "Applying audio enhancements...")
-                # Fetch audio enhancement parameters from config
-                audio_enhance_params = self.config.get_setting("processing_parameters.audio_enhancement")
-                success, msg = self.audio_processor.process_audio_file(
-                    temp_audio_path, temp_enhanced_audio_path, False, # Do not delete original temp_audio_path
-                    progress_callback_func=lambda p, m: self._update_progress(int(30 + p * 0.1), m) # Scale progress
-                )
-                if not success:
-                    raise SocialMediaVideoProcessorError(f"Audio enhancement failed: {msg}")
-                self.logger.info("Audio enhancements applied.")
-                audio_for_transcription_path = temp_enhanced_audio_path
-            else:
-                self.logger.info("Skipping automatic audio enhancements.")
-                audio_for_transcription_path = temp_audio_path # Use original extracted audio if no enhancement
-
-            # Step 4: Generate Subtitles (if enabled)
-            subtitle_clip = None
-            if processing_options.get("generate_subtitles") and audio_for_transcription_path and audio_for_transcription_path.exists():
-                self.logger.info("Generating subtitles from audio.")
-                self._update_progress(40, "Transcribing audio for subtitles...")
-                
-                # Transcribe using Vosk (offline ASR)
-                words_info = self._transcribe_audio_vosk(audio_for_transcription_path)
-                
-                if words_info:
-                    words_per_line = processing_options.get("subtitle_words_per_line", 3)
-                    srt_content = self._generate_srt_content(words_info, words_per_line)
-                    
-                    with open(temp_subtitles_file, "w", encoding="utf-8") as f:
-                        f.write(srt_content)
-                    self.logger.info(f"SRT subtitles generated to: {temp_subtitles_file}")
-
-                    # Use MoviePy's TextClip to create subtitle overlay
-                    font_name = processing_options.get("default_subtitle_font_name", "Arial")
-                    font_path = self.font_manager.get_font_path(font_name) or self.font_manager.get_default_font_path()
-                    
-                    if not font_path.exists():
-                        self.logger.error(f"Subtitle font not found: {font_path}. Using system default.")
-                        font_path = self.font_manager.get_default_font_path() # Fallback to a guaranteed font
-                        
-                    font_size = processing_options.get("subtitle_font_size", 40)
-                    font_color = processing_options.get("subtitle_color", "#FFFFFF")
-                    stroke_width = processing_options.get("subtitle_stroke_width", 2)
-                    stroke_color = processing_options.get("subtitle_stroke_color", "#000000")
-                    # position_y_ratio: 0.0 (top) to 1.0 (bottom)
-                    position_y_ratio = processing_options.get("subtitle_font_position_y", 0.85)
-
-                    # Subtitle styling can be complex. MoviePy TextClip offers good control.
-                    # This example creates a single TextClip that will be dynamically updated
-                    # using FFmpeg's subtitles filter for better performance with complex videos.
-                    self.logger.info("Preparing subtitles for video embedding.")
-                    self._update_progress(50, "Embedding subtitles...")
-                else:
-                    self.logger.warning("No words transcribed, skipping subtitle generation.")
-            else:
-                self.logger.info("Skipping subtitle generation.")
-
-            # Determine the current video source for cropping/finalization
-            current_video_source = input_filepath_for_next_step
 
             # Step 5: Apply Intelligent Cropping (if enabled)
             if processing_options.get("auto_crop"):
                 self.logger.info("Applying intelligent cropping.")
-                self._update_progress(60, "Detecting content for smart cropping...")
+                self._update_progress(40, "Detecting content for smart cropping...")
                 
-                bounding_box = self._get_main_content_bounding_box(current_video_source)
+                bounding_box = self._get_main_content_bounding_box(input_filepath)
                 
                 if bounding_box:
                     x, y, w, h = bounding_box
-                    target_resolution_str = processing_options.get("target_social_media_resolution", "1080x1920")
-                    target_width, target_height = map(int, target_resolution_str.split('x'))
 
                     # Calculate target aspect ratio
                     target_aspect_ratio = target_width / target_height
@@ -509,189 +1454,122 @@ class SocialMediaVideoProcessor:
                     crop_h = min(crop_h, original_height - crop_y)
 
                     self.logger.info(f"Calculated crop: x={crop_x}, y={crop_y}, w={crop_w}, h={crop_h}")
-                    self._update_progress(70, "Applying crop and resizing...")
-
-                    # Use FFmpeg to apply crop and resize in one go for efficiency
-                    cmd_crop_resize = [
-                        "ffmpeg",
-                        "-i", str(current_video_source),
-                        "-vf", f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y},scale={target_width}:{target_height}",
-                        "-c:v", "libx264", # Re-encode with h264
-                        "-preset", "medium",
-                        "-crf", "23",
-                        "-c:a", "copy", # Copy audio
-                        "-y", str(temp_cropped_video_path)
-                    ]
-                    success_crop, msg_crop = self._run_ffmpeg_command(cmd_crop_resize, "intelligent cropping and resizing")
-                    if not success_crop:
-                        raise SocialMediaVideoProcessorError(f"Intelligent cropping failed: {msg_crop}")
-                    current_video_source = temp_cropped_video_path
+                    video_filters.append(f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y}")
+                    filtered_size = (crop_w, crop_h)
                 else:
                     self.logger.warning("Intelligent cropping enabled but no main content detected. Skipping crop.")
             else:
                 self.logger.info("Skipping intelligent cropping.")
 
-            # Step 6: Compose final video (subtitles, overlays)
-            self.logger.info("Composing final video with subtitles and overlays.")
-            self._update_progress(80, "Compositing final video...")
+            # Scale to the target resolution before subtitles and overlays, so they are rendered (and
+            # blended) at output size. Enhancement runs after the crop and on whichever side of the
+            # scale has fewer pixels. The frame keeps its aspect ratio and is letterboxed to the
+            # target size, instead of being stretched when the crop didn't match. The pad always comes
+            # last, so the black bars are never denoised, sharpened or colour-adjusted.
+            scale_filters = []
+            pad_filters = []
+            if filtered_size != (target_width, target_height):
+                scale_filters = [f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease:force_divisible_by=2:flags=lanczos"]
+                pad_filters = [f"pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2:color=black"]
+            if enhancement_filter and target_width * target_height < filtered_size[0] * filtered_size[1]:
+                video_filters += scale_filters + [enhancement_filter] + pad_filters
+            else:
+                video_filters += ([enhancement_filter] if enhancement_filter else []) + scale_filters + pad_filters
 
-            # Reload video clip after potential enhancements/cropping
-            final_video_clip_no_audio = VideoFileClip(str(current_video_source))
+            if processing_options.get("generate_subtitles"):
+                # Subtitles are burned in by the video pass, so it has to wait for the transcript
+                self._update_progress(45, "Waiting for transcription to finish...")
+                audio_for_transcription_path, font_path = audio_future.result()
 
-            # Apply subtitles using FFmpeg's subtitles filter for better performance
+            # Apply subtitles using FFmpeg's ass filter for better performance
             if processing_options.get("generate_subtitles") and temp_subtitles_file.exists():
                 self.logger.info("Applying subtitles to video via FFmpeg filter.")
                 
-                # FFmpeg subtitle filter requires font config in a specific way
-                # Escape font path for FFmpeg, especially on Windows
-                escaped_font_path = str(font_path).replace("\\", "/") # Convert backslashes to forward slashes for FFmpeg
-                
-                # Subtitle text style directly in filter string (simplistic, for advanced, consider ASS)
-                # FFmpeg subtitles filter: subtitles='path/to/sub.srt':force_style='Fontname=Arial,FontSize=24,PrimaryColour=&H00FFFFFF'
-                # Note: FFmpeg colors are usually BGR hex or by name
-                # Convert #RRGGBB to FFmpeg's &HBBGGRR format, plus transparency if needed
-                subtitle_color_rgb = processing_options.get("subtitle_color", "#FFFFFF").lstrip('#')
-                # BBGGRR for FFmpeg
-                subtitle_color_bgr = f"&H00{subtitle_color_rgb[4:6]}{subtitle_color_rgb[2:4]}{subtitle_color_rgb[0:2]}"
-
-                # Font styling for FFmpeg subtitles filter
-                # PrimaryColour (for text color), OutlineColour (for stroke/outline)
-                # Outline (for stroke width)
-                stroke_color_rgb = processing_options.get("subtitle_stroke_color", "#000000").lstrip('#')
-                subtitle_stroke_color_bgr = f"&H00{stroke_color_rgb[4:6]}{stroke_color_rgb[2:4]}{stroke_color_rgb[0:2]}"
-
-
-                subtitle_style_string = (
-                    f"Fontname={Path(font_path).stem}," # Use stem if font path is too complex
-                    f"FontSize={processing_options.get('subtitle_font_size', 40)},"
-                    f"PrimaryColour={subtitle_color_bgr},"
-                    f"OutlineColour={subtitle_stroke_color_bgr}," # Convert to BGR for outline
-                    f"Outline={processing_options.get('subtitle_stroke_width', 2)},"
-                    f"Alignment=2," # 2 is bottom center in some contexts, but usually a number based on position. ASS uses this.
-                    f"MarginV={int(final_video_clip_no_audio.h * (1.0 - processing_options.get('subtitle_font_position_y', 0.85)))}" # Vertical margin from bottom
+                # The style lives in the ASS header (one "Default" style for every event) instead of
+                # force_style, so libass parses it once and reuses its glyph/outline caches.
+                subtitle_style = self._get_subtitle_style(processing_options, font_path, target_height)
+                self._write_ass_subtitles(temp_subtitles_file, temp_ass_subtitles_file, subtitle_style, target_width, target_height)
+
+                video_filters.append(
+                    f"ass={self._escape_filter_path(temp_ass_subtitles_file)}"
+                    f":fontsdir={self._escape_filter_path(Path(font_path).parent)}"
                 )
-                
-                # Create a temporary video with subtitles embedded
-                cmd_add_subtitles = [
-                    "ffmpeg",
-                    "-i", str(current_video_source),
-                    "-vf", f"subtitles='{str(temp_subtitles_file)}':force_style='{subtitle_style_string}'",
-                    "-c:v", "libx264", "-preset", "medium", "-crf", "23",
-                    "-c:a", "copy",
-                    "-y", str(temp_final_video_no_subtitles_path)
-                ]
-                success_subtitles, msg_subtitles = self._run_ffmpeg_command(cmd_add_subtitles, "embedding subtitles")
-                if not success_subtitles:
-                    self.logger.warning(f"Failed to embed subtitles: {msg_subtitles}. Proceeding without subtitles.")
-                    final_video_with_subs = final_video_clip_no_audio
-                else:
-                    self.logger.info("Subtitles embedded successfully.")
-                    final_video_with_subs = VideoFileClip(str(temp_final_video_no_subtitles_path))
-                
-                # Clean up the intermediate video created just for subtitles
-                final_video_clip_no_audio.close() # Close previous clip
-                current_video_source = temp_final_video_no_subtitles_path # Update source for next step
-
             else:
                 self.logger.info("Skipping subtitle embedding.")
-                final_video_with_subs = VideoFileClip(str(current_video_source)) # Use current video directly
 
-            # Apply overlays (if any)
+            # Step 6: Overlays are drawn by FFmpeg (drawtext/overlay) in the same filtergraph whenever
+            # possible; MoviePy compositing is only the fallback for overlays FFmpeg can't render.
             overlays_data = processing_options.get("overlays", [])
+            overlay_graph = None
             if overlays_data:
                 self.logger.info(f"Applying {len(overlays_data)} overlays.")
-                composite_clip = final_video_with_subs
-                for overlay_info in overlays_data:
-                    overlay_text = overlay_info.get("text")
-                    overlay_image_path = overlay_info.get("image_path")
-                    start_time = overlay_info.get("start_time", 0)
-                    end_time = overlay_info.get("end_time", final_video_with_subs.duration)
-                    position_x = overlay_info.get("position_x", "center") # "center" or pixel value
-                    position_y = overlay_info.get("position_y", "center") # "center" or pixel value
-                    overlay_duration = overlay_info.get("duration", None)
-
-                    if overlay_text:
-                        text_clip = TextClip(
-                            overlay_text,
-                            fontsize=overlay_info.get("font_size", 50),
-                            color=overlay_info.get("color", "white"),
-                            font=overlay_info.get("font_name", "Arial"),
-                            stroke_color=overlay_info.get("stroke_color", None),
-                            stroke_width=overlay_info.get("stroke_width", 0),
-                            bg_color=overlay_info.get("bg_color", None)
-                        )
-                        # Set position
-                        text_clip = text_clip.set_position((position_x, position_y))
-                        # Set duration
-                        text_clip = text_clip.set_start(start_time).set_end(end_time)
-                        if overlay_duration:
-                            text_clip = text_clip.set_duration(overlay_duration)
-                        
-                        composite_clip = CompositeVideoClip([composite_clip, text_clip])
-                        self.logger.debug(f"Added text overlay: '{overlay_text}'")
-
-                    elif overlay_image_path:
-                        if Path(overlay_image_path).exists():
-                            img_clip = ImageClip(str(overlay_image_path))
-                            # Resize if needed
-                            img_clip = img_clip.resize(height=overlay_info.get("height", 100)) # Default height for images
-                            # Set position
-                            img_clip = img_clip.set_position((position_x, position_y))
-                            # Set duration
-                            img_clip = img_clip.set_start(start_time).set_end(end_time)
-                            if overlay_duration:
-                                img_clip = img_clip.set_duration(overlay_duration)
-
-                            composite_clip = CompositeVideoClip([composite_clip, img_clip])
-                            self.logger.debug(f"Added image overlay: '{overlay_image_path}'")
-                        else:
-                            self.logger.warning(f"Overlay image not found: {overlay_image_path}")
-                final_clip = composite_clip
+                overlay_graph = self._build_overlay_filtergraph(video_filters, overlays_data, original_duration, temp_working_dir)
             else:
                 self.logger.info("No overlays to apply.")
-                final_clip = final_video_with_subs # Use the video with subtitles if any
 
-            # Final audio assembly
-            if audio_for_transcription_path and audio_for_transcription_path.exists():
-                self.logger.info("Attaching final audio to video.")
-                final_audio_clip = AudioFileClip(str(audio_for_transcription_path))
-                final_clip = final_clip.set_audio(final_audio_clip)
+            if not overlays_data or overlay_graph:
+                # Step 7: the filtergraph, the overlays, the audio mux and the export run as a
+                # single FFmpeg encode straight into the output file.
+                final_filter, image_inputs = overlay_graph or (",".join(video_filters), None)
+                audio_for_transcription_path, font_path = audio_future.result()
+                if not audio_for_transcription_path:
+                    self.logger.warning("No audio to attach to the final video.")
+                self.logger.info(f"Exporting final social media video to: {output_filepath}")
+                self._update_progress(50, "Applying video filters and exporting final video...")
+                success_export, msg_export = self._encode_with_filters(
+                    input_filepath, output_filepath, final_filter, "final export",
+                    audio_path=audio_for_transcription_path, x264_preset=x264_preset,
+                    image_inputs=image_inputs, preview=preview
+                )
+                if not success_export:
+                    raise SocialMediaVideoProcessorError(f"Final export failed: {msg_export}")
             else:
-                self.logger.warning("No audio to attach to the final video.")
-                final_clip = final_clip.without_audio() # Ensure no audio if not explicitly added
-
-            # Step 7: Export Final Video
-            self.logger.info(f"Exporting final social media video to: {output_filepath}")
-            self._update_progress(95, "Exporting final video...")
-            
-            # Ensure final output resolution is correct after all transformations
-            target_resolution_str = processing_options.get("target_social_media_resolution", "1080x1920")
-            target_width, target_height = map(int, target_resolution_str.split('x'))
-
-            # Resize the final clip to the target social media resolution
-            if final_clip.size != (target_width, target_height):
-                self.logger.info(f"Resizing final video from {final_clip.size} to {target_width}x{target_height}.")
-                final_clip = moviepy_resize_fx(final_clip, newsize=(target_width, target_height))
-
-            final_clip.write_videofile(
-                str(output_filepath),
-                codec="libx264", # H.264 for broad compatibility
-                audio_codec="aac",
-                preset="medium",
-                threads=os.cpu_count(),
-                logger="bar" # Show MoviePy's internal progress
-            )
+                current_video_source = input_filepath
+                if video_filters:
+                    self._update_progress(50, "Applying video filters (enhancement, crop, scale, subtitles)...")
+                    success_filters, msg_filters = self._encode_with_filters(
+                        input_filepath, temp_processed_video_path, ",".join(video_filters), "video filtering",
+                        x264_preset=x264_preset, preview=preview
+                    )
+                    if not success_filters:
+                        raise SocialMediaVideoProcessorError(f"Video filtering failed: {msg_filters}")
+                    current_video_source = temp_processed_video_path
+
+                # Join the audio branch (already finished if subtitles were requested)
+                audio_for_transcription_path, font_path = audio_future.result()
+
+                # MoviePy fallback: compose the overlays over the filtered video
+                self.logger.info("Composing final video with overlays in MoviePy.")
+                self._update_progress(80, "Compositing final video...")
+                final_clip = self._compose_overlay_clip(current_video_source, overlays_data)
+
+                # Step 7: Export Final Video
+                self.logger.info(f"Exporting final social media video to: {output_filepath}")
+                self._update_progress(95, "Exporting final video...")
+
+                # The composited frames are piped straight into FFmpeg, which also muxes the audio
+                # from its file; MoviePy never touches the audio or the container.
+                if not audio_for_transcription_path:
+                    self.logger.warning("No audio to attach to the final video.")
+                # Extra render threads each composite from their own reader of the same source
+                success_export, msg_export = self._export_clip_via_ffmpeg_pipe(
+                    final_clip, output_filepath, audio_for_transcription_path, x264_preset,
+                    clip_factory=functools.partial(self._compose_overlay_clip, current_video_source, overlays_data),
+                    preview=preview
+                )
+                # Release the reader (it may be reading the source, which can be deleted below) as soon
+                # as the export is done; the finally block only closes the clip if the export raised.
+                self._close_composed_clip(final_clip)
+                final_clip = None
+                if not success_export:
+                    raise SocialMediaVideoProcessorError(f"Final export failed: {msg_export}")
 
             self._update_progress(100, "Social media video processing complete!")
             self.logger.info(f"Social media video processing completed successfully: {output_filepath}")
 
             if processing_options.get("delete_original_after_processing", False):
-                self.logger.info(f"Attempting to delete original file: {input_filepath}")
-                try:
-                    os.remove(input_filepath)
-                    self.logger.info(f"Original file deleted: {input_filepath}")
-                except OSError as e:
-                    self.logger.warning(f"Failed to delete original file {input_filepath}: {e}. Skipping deletion.")
+                self.logger.info(f"Scheduling deletion of original file: {input_filepath}")
+                self._deletion_executor.submit(self._delete_original_file, input_filepath)
             
             self._is_processing = False
             return True, f"Social media video processed successfully! Saved to: {output_filepath}"
@@ -717,12 +1595,12 @@ class SocialMediaVideoProcessor:
                     self.logger.warning(f"Failed to clean up partial output file {output_filepath}: {cleanup_e}")
             return False, f"An unexpected error occurred during processing: {e}"
         finally:
-            if video_clip: video_clip.close()
-            if audio_clip: audio_clip.close()
-            if final_clip: final_clip.close()
-            if temp_working_dir.exists():
-                self.logger.info(f"Cleaning up temporary directory: {temp_working_dir}")
-                shutil.rmtree(temp_working_dir, ignore_errors=True)
+            if audio_future is not None:
+                wait([audio_future]) # Don't remove the temp directory while the audio branch still uses it
+            if final_clip: self._close_composed_clip(final_clip)
+            self._text_clip_cache.clear()
+            self.logger.info(f"Cleaning up temporary directory: {temp_working_dir}")
+            temp_dir.cleanup()
             self._external_progress_callback = None # Clear callback
 
 
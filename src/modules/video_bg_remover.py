@@ -1,74 +1,315 @@
 import os
-import shutil
 import subprocess
 import logging
 import tempfile
-import atexit
-import io
+import json
+import math
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image
-from moviepy import VideoFileClip, AudioFileClip, CompositeAudioClip # MoviePy for video/audio manipulation
 from rembg import remove # For background removal
 from typing import Tuple, Optional, Callable, List, Dict, Any
 
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
+from src.utils.ffmpeg_tools import get_ffmpeg_binary, get_ffprobe_binary
+
+# Frames are processed at a fixed rate (adjust if needed for quality vs. speed)
+PROCESSING_FPS = 25
+# Pipe buffer for the raw frame streams; a 1080p RGBA frame is ~8 MB, so this keeps writes large
+FRAME_PIPE_BUFFER_BYTES = 1 << 20
+# rembg runs on this many frames at once (at most, and at most half the cores): inference overlaps
+# with the single-threaded resizing and alpha work of other frames. Each frame in flight holds a
+# decoded and a processed frame in memory.
+REMBG_MAX_WORKERS = 4
+# Frames that may wait between the decode, rembg and encode stages (each one is a full RGBA frame)
+FRAME_QUEUE_SIZE = 2
+# Progress updates (GUI callback and log line) are passed on at most every this many seconds
+PROGRESS_MIN_INTERVAL_SECONDS = 0.1
 
 class VideoBgRemoverError(Exception):
     """Custom exception for video background removal errors."""
     pass
 
+class _FfmpegFramePipe:
+    """
+    A single long-lived FFmpeg process that raw frames are streamed through, either read from
+    its stdout (decoder) or written to its stdin (encoder), for the whole clip.
+    stderr goes to a temp file so a chatty FFmpeg can never block on a full pipe.
+    """
+    def __init__(self, command: List[str], frame_shape: Tuple[int, int, int], writable: bool):
+        self.frame_shape = frame_shape
+        self.frame_bytes = frame_shape[0] * frame_shape[1] * frame_shape[2]
+        self._frame_buffer = None # Decoder side: allocated on the first read_frame without out
+        self._stderr_file = tempfile.TemporaryFile()
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE if writable else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL if writable else subprocess.PIPE,
+                stderr=self._stderr_file,
+                bufsize=FRAME_PIPE_BUFFER_BYTES,
+                creationflags=creationflags
+            )
+        except Exception:
+            self._stderr_file.close()
+            raise
+
+    def __enter__(self) -> "_FfmpegFramePipe":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.kill()
+
+    def read_frame(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Returns the next frame, or None once the decoder has no more complete frames.
+        The frame is read into out (a C-contiguous uint8 array of frame_shape) when given, otherwise
+        into a buffer reused by every call, so it is only valid until the next read.
+        """
+        if out is None:
+            if self._frame_buffer is None:
+                self._frame_buffer = np.empty(self.frame_shape, dtype=np.uint8)
+            out = self._frame_buffer
+        if self._process.stdout.readinto(memoryview(out).cast("B")) < self.frame_bytes:
+            return None
+        return out
+
+    def write_frame(self, frame: np.ndarray):
+        """Writes one frame to the encoder straight from its buffer (tobytes() would copy it first)."""
+        # ascontiguousarray is a no-op for the usual C-contiguous frames
+        self._process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+
+    def close(self) -> Tuple[int, str]:
+        """Closes the pipes, waits for FFmpeg to exit and returns its exit code and stderr output."""
+        for stream in (self._process.stdin, self._process.stdout):
+            if stream:
+                try:
+                    stream.close()
+                except OSError:
+                    pass # FFmpeg exited early (broken pipe); its exit code and stderr say why
+        returncode = self._process.wait()
+        if self._stderr_file.closed:
+            return returncode, "" # Already closed
+        self._stderr_file.seek(0)
+        stderr_text = self._stderr_file.read().decode('utf-8', errors='replace')
+        self._stderr_file.close()
+        return returncode, stderr_text
+
+    def kill(self):
+        """Stops FFmpeg without waiting for it to finish its stream (used on errors)."""
+        if self._process.poll() is None:
+            self._process.kill()
+        self.close()
+
 class VideoBgRemover:
     """
     Handles background removal for video files.
-    Extracts frames, processes them with 'rembg', and reassembles the video.
-    Utilizes FFmpeg for video/audio extraction and reassembly.
+    Streams decoded frames out of FFmpeg, processes them with 'rembg', and streams the
+    results into a second FFmpeg process that encodes them and muxes the original audio.
     """
     def __init__(self):
         self.logger = get_application_logger()
         self.config = get_application_config()
         self._is_processing = False # Internal state to track if a process is in progress
         self._external_progress_callback = None # Callback for GUI progress updates
+        self._last_progress_time = 0.0 # time.monotonic() of the last progress update passed on
 
         # Retrieve the models directory from the configuration manager.
         # This path is set by the main application during startup, ensuring models
         # are looked for in the application's designated directory.
         self.models_dir = Path(self.config.get_setting("app_settings.models_dir"))
+        # Decoder, encoder and probe executables; the bundled ffprobe sits next to FFMPEG_BINARY
+        self.ffmpeg_binary = get_ffmpeg_binary()
+        self.ffprobe_binary = get_ffprobe_binary()
         self.logger.info(f"VideoBgRemover initialized. Models directory set to: {self.models_dir}")
 
-    def _update_progress(self, progress_percentage: int, message: str, level: str = "info"):
+    def _update_progress(self, progress_percentage: int, message: str, level: str = "info", throttle: bool = False):
         """
         Internal helper to update progress and log messages.
         Ensures progress_percentage is within a valid range [0, 100].
+        With throttle (per-frame updates), at most one update per PROGRESS_MIN_INTERVAL_SECONDS is
+        passed on, so the GUI callback and the log line don't slow down the frame loop.
         """
+        now = time.monotonic()
+        if throttle and now - self._last_progress_time < PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        self._last_progress_time = now
         if self._external_progress_callback:
             # Clamp progress percentage to ensure it's always between 0 and 100
             clamped_percentage = max(0, min(100, progress_percentage))
             self._external_progress_callback(clamped_percentage, message)
         self.logger.log(getattr(logging, level.upper()), f"VIDEO_BG_REMOVE_PROGRESS: {message} ({progress_percentage}%)")
 
-    def _run_ffmpeg_command(self, command: List[str], description: str, log_level: str = "info") -> Tuple[bool, str]:
+    def _probe_video_properties(self, video_filepath: Path) -> Tuple[int, int, float]:
         """
-        Executes an FFmpeg command using subprocess.
+        Reads the displayed width and height and the duration of the first video stream.
+        Width and height are swapped for rotated streams, since FFmpeg auto-rotates while decoding.
+
+        Returns:
+            Tuple[int, int, float]: (width, height, duration in seconds).
         """
-        self.logger.info(f"Executing FFmpeg command for {description}: {' '.join(command)}")
+        cmd_probe = [
+            self.ffprobe_binary, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,duration:stream_tags=rotate:stream_side_data=rotation:format=duration",
+            "-of", "json",
+            str(video_filepath)
+        ]
         try:
-            process = subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', creationflags=subprocess.CREATE_NO_WINDOW)
-            self.logger.debug(f"FFmpeg STDOUT: {process.stdout}")
-            self.logger.debug(f"FFmpeg STDERR: {process.stderr}")
-            self.logger.log(getattr(logging, log_level.upper()), f"FFmpeg command for {description} completed successfully.")
-            return True, "Success"
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            process = subprocess.run(cmd_probe, check=True, capture_output=True, text=True, encoding='utf-8', creationflags=creationflags)
+            probe_data = json.loads(process.stdout)
+            stream = probe_data["streams"][0]
+            width, height = int(stream["width"]), int(stream["height"])
+            rotation = stream.get("tags", {}).get("rotate") or next(
+                (side_data["rotation"] for side_data in stream.get("side_data_list", []) if "rotation" in side_data), 0)
+            if abs(int(float(rotation))) % 180 == 90:
+                width, height = height, width
+            # Some containers only report the duration at format level
+            duration = float(stream.get("duration") or probe_data.get("format", {}).get("duration") or 0.0)
+            return width, height, duration
         except subprocess.CalledProcessError as e:
-            self.logger.error(f"FFmpeg command failed for {description}. Exit code: {e.returncode}", exc_info=True)
-            self.logger.error(f"FFmpeg STDOUT: {e.stdout}")
-            self.logger.error(f"FFmpeg STDERR: {e.stderr}")
-            return False, f"FFmpeg command failed: {e.stderr}"
+            self.logger.error(f"ffprobe failed for {video_filepath}. STDERR: {e.stderr}")
+            raise VideoBgRemoverError(f"Could not read video properties: {e.stderr}")
         except FileNotFoundError:
-            self.logger.critical("FFmpeg executable not found. Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
-            return False, "FFmpeg not found. Please install it and add to PATH."
+            self.logger.critical(f"ffprobe executable not found ({self.ffprobe_binary}). Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            raise VideoBgRemoverError("ffprobe not found. Please install FFmpeg and add it to PATH.")
+        except (KeyError, IndexError, ValueError) as e:
+            self.logger.error(f"Unexpected ffprobe output for {video_filepath}: {e}", exc_info=True)
+            raise VideoBgRemoverError(f"Could not read video properties from: {video_filepath}")
+
+    def _remove_frame_background(self, frame_rgba: np.ndarray, frame_number: int) -> np.ndarray:
+        """
+        Runs rembg on one decoded RGBA frame and writes the mask into its alpha channel in place.
+        Returns the same frame. Called from the frame worker threads.
+        """
+        try:
+            # Call rembg.remove, explicitly setting the model_dir
+            # Ensure the model (e.g., u2net.onnx) is present in self.models_dir
+            # Only the single-channel mask is requested and attached as the alpha channel here, in one
+            # NumPy pass, instead of rembg compositing the frame onto a transparent image and converting it.
+            # rembg converts its input to RGB itself, so the (opaque) decoded alpha is simply ignored.
+            mask = remove(Image.fromarray(frame_rgba), only_mask=True, model_dir=str(self.models_dir), model_name="u2net")
+            frame_rgba[..., 3] = np.asarray(mask if mask.mode == 'L' else mask.convert('L'))
+            return frame_rgba
         except Exception as e:
-            self.logger.error(f"An unexpected error occurred while running FFmpeg command for {description}: {e}", exc_info=True)
-            return False, f"Unexpected error: {e}"
+            self.logger.error(f"Error processing frame {frame_number}: {e}", exc_info=True)
+            # If the rembg model is missing, this is where it might manifest.
+            if "onnxruntime.capi.onnxruntime_pybind11_state.Fail" in str(e) or "No such file or directory" in str(e) or "ONNX model not found" in str(e):
+                raise VideoBgRemoverError(f"Rembg model (u2net.onnx) might be missing or corrupted. Ensure it's downloaded in '{self.models_dir}'.")
+            raise VideoBgRemoverError(f"Failed to process frame {frame_number}: {e}")
+
+    def _process_frames(self, decoder: _FfmpegFramePipe, encoder: _FfmpegFramePipe, total_frames: int) -> int:
+        """
+        Runs every decoded frame through rembg and into the encoder as a three-stage pipeline:
+        a reader thread decodes frames, this thread runs rembg on them on the worker pool and
+        collects the results in decode order, and a writer thread feeds them to the encoder.
+        Bounded queues between the stages let decoding and encoding overlap with rembg.
+
+        Frames live in preallocated RGBA buffers that cycle through the stages: the reader decodes
+        into a free buffer, rembg writes the mask into its alpha channel in place, and the writer
+        returns the buffer once it is encoded, so the loop allocates no frame-sized arrays.
+
+        Returns:
+            int: The number of frames handed to the encoder (fewer than decoded if it exited early).
+        """
+        worker_count = max(1, min(REMBG_MAX_WORKERS, (os.cpu_count() or 1) // 2))
+        max_in_flight = worker_count * 2
+        # One buffer per frame that can be queued, in flight, being decoded or being encoded at once
+        free_buffers = queue.Queue()
+        for _ in range(max_in_flight + 2 * FRAME_QUEUE_SIZE + 2):
+            free_buffers.put(np.empty(decoder.frame_shape, dtype=np.uint8))
+        decoded_frames = queue.Queue(maxsize=FRAME_QUEUE_SIZE) # Reader -> this thread; None (or an exception) at the end
+        finished_frames = queue.Queue(maxsize=FRAME_QUEUE_SIZE) # This thread -> writer, in order; None at the end
+        stop_event = threading.Event()
+
+        def get(source: queue.Queue) -> Any:
+            while not stop_event.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return None
+
+        def put(target: queue.Queue, item: Any) -> bool:
+            while not stop_event.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read_frames() -> None:
+            try:
+                while (buffer := get(free_buffers)) is not None:
+                    frame_rgba = decoder.read_frame(out=buffer)
+                    if frame_rgba is None:
+                        break
+                    if not put(decoded_frames, frame_rgba):
+                        return
+            except Exception as e:
+                put(decoded_frames, e) # Re-raised on the processing thread
+                return
+            put(decoded_frames, None)
+
+        def write_frames() -> None:
+            while (frame_rgba := get(finished_frames)) is not None:
+                try:
+                    encoder.write_frame(frame_rgba)
+                except OSError:
+                    stop_event.set() # The encoder exited early (broken pipe); its exit code and stderr say why
+                    return
+                free_buffers.put(frame_rgba)
+
+        reader = threading.Thread(target=read_frames, name="video_bg_remove_reader", daemon=True)
+        writer = threading.Thread(target=write_frames, name="video_bg_remove_writer", daemon=True)
+        reader.start()
+        writer.start()
+        pending_frames = deque() # Futures of the frames in flight, oldest first
+        frame_count = 0
+        processed_frames = 0
+        try:
+            with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="video_bg_remove") as executor:
+                decoding = True
+                while True:
+                    if decoding:
+                        frame_rgba = get(decoded_frames)
+                        if isinstance(frame_rgba, Exception):
+                            raise frame_rgba
+                        decoding = frame_rgba is not None
+                    if decoding:
+                        frame_count += 1
+                        pending_frames.append(executor.submit(self._remove_frame_background, frame_rgba, frame_count))
+                        if len(pending_frames) < max_in_flight:
+                            continue
+                    elif not pending_frames:
+                        break
+                    if not put(finished_frames, pending_frames.popleft().result()):
+                        break # The writer stopped because the encoder exited early
+                    processed_frames += 1
+                    self._update_progress(
+                        int(10 + (processed_frames / total_frames) * 80), # Progress from 10% to 90%
+                        f"Processing frame {processed_frames}/{total_frames} for background removal...",
+                        throttle=True
+                    )
+            put(finished_frames, None) # The writer encodes what is still queued, then exits
+        except BaseException:
+            stop_event.set()
+            raise
+        finally:
+            # Both threads use the FFmpeg pipes, so they finish before the caller closes (or kills) them
+            reader.join()
+            writer.join()
+        return processed_frames
 
     def remove_video_background(self, input_filepath: Path, output_filepath: Path, delete_original: bool = False, progress_callback_func=None):
         """
@@ -112,117 +353,65 @@ class VideoBgRemover:
             self.logger.warning(f"Output file extension changed from '{output_filepath.suffix}' to '.webm' for transparency.")
             output_filepath = output_filepath.with_suffix(".webm")
 
-        temp_dir_prefix = f"creators_toolkit_vid_bg_remove_{os.getpid()}_"
-        temp_working_dir = Path(tempfile.mkdtemp(prefix=temp_dir_prefix))
-        atexit.register(lambda: shutil.rmtree(temp_working_dir, ignore_errors=True))
-        self.logger.info(f"Created temporary working directory: {temp_working_dir}")
+        try:
+            # Step 1: Read the frame size and length so frames can be streamed as raw video
+            self._update_progress(5, "Reading video properties...")
+            width, height, duration = self._probe_video_properties(input_filepath)
+            total_frames = max(1, math.ceil(duration * PROCESSING_FPS))
+            self.logger.info(f"Video is {width}x{height}, {duration:.2f}s (~{total_frames} frames at {PROCESSING_FPS} FPS).")
 
-        temp_extracted_audio_path = temp_working_dir / "extracted_audio.aac"
-        temp_processed_frames_pattern = temp_working_dir / "processed_frame_%07d.png" # For reassembly
-        
-        video_clip = None # Initialize to None for finally block
-        audio_clip = None # Initialize to None for finally block
+            # Set output video codec based on desired output extension
+            video_codec = "libvpx-vp9" # For WebM with alpha channel
+            pixel_format = "yuva420p" # For alpha channel support
+            audio_codec = "libopus" # WebM only carries Opus/Vorbis audio
 
-        try:
-            # Step 1: Extract video frames and audio
-            self.logger.info("Extracting video frames and audio...")
-            self._update_progress(5, "Extracting frames and audio...")
-            
-            # Extract video frames
-            frames_output_pattern = temp_working_dir / "frame_%07d.png"
-            cmd_extract_frames = [
-                "ffmpeg",
+            if output_filepath.suffix.lower() == ".mov":
+                video_codec = "prores_ks" # ProRes 4444 (supports alpha)
+                pixel_format = "yuva444p10le" # For ProRes 4444
+                audio_codec = "aac"
+
+            # Step 2: Stream frames from one decoder process, through rembg, into one encoder process.
+            # The encoder takes the audio straight from the input file ('?' makes it optional).
+            cmd_decode = [
+                self.ffmpeg_binary, "-v", "error",
                 "-i", str(input_filepath),
-                "-vf", "fps=25", # Extract at 25 FPS (adjust if needed for quality vs. speed)
-                str(frames_output_pattern)
+                "-vf", f"fps={PROCESSING_FPS}",
+                "-f", "rawvideo", "-pix_fmt", "rgba", # Decoded straight into the output layout; rembg fills in the alpha
+                "pipe:1"
             ]
-            success_frames, msg_frames = self._run_ffmpeg_command(cmd_extract_frames, "frame extraction")
-            if not success_frames:
-                raise VideoBgRemoverError(f"Failed to extract video frames: {msg_frames}")
-            self.logger.info("Video frames extracted successfully.")
-
-            # Extract audio (if present)
-            cmd_extract_audio = [
-                "ffmpeg",
+            cmd_encode = [
+                self.ffmpeg_binary, "-v", "error",
+                "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(PROCESSING_FPS),
+                "-i", "pipe:0",
                 "-i", str(input_filepath),
-                "-vn", # No video
-                "-acodec", "aac", # Audio codec
-                "-b:a", "192k", # Audio bitrate
-                "-y", str(temp_extracted_audio_path)
+                "-map", "0:v:0", "-map", "1:a:0?",
+                "-c:v", video_codec, "-pix_fmt", pixel_format,
+                "-c:a", audio_codec, "-b:a", "192k",
+                "-shortest",
+                "-y", str(output_filepath)
             ]
-            success_audio, msg_audio = self._run_ffmpeg_command(cmd_extract_audio, "audio extraction")
-            if success_audio:
-                self.logger.info("Audio extracted successfully.")
-                audio_clip = AudioFileClip(str(temp_extracted_audio_path))
-            else:
-                self.logger.warning(f"Audio extraction failed or no audio stream: {msg_audio}. Proceeding without audio.")
-
-            # Step 2: Process each frame with rembg
-            self.logger.info("Processing frames for background removal...")
-            input_frames = sorted(list(temp_working_dir.glob("frame_*.png")))
-            if not input_frames:
-                raise VideoBgRemoverError("No frames found to process.")
+            self.logger.info(f"Executing FFmpeg command for frame decoding: {' '.join(cmd_decode)}")
+            self.logger.info(f"Executing FFmpeg command for frame encoding: {' '.join(cmd_encode)}")
+            self._update_progress(10, "Processing frames for background removal...")
 
-            total_frames = len(input_frames)
-            for i, frame_path in enumerate(input_frames):
-                self._update_progress(
-                    int(10 + (i / total_frames) * 70), # Progress from 10% to 80%
-                    f"Processing frame {i+1}/{total_frames} for background removal..."
-                )
-                try:
-                    with open(frame_path, 'rb') as f_in:
-                        input_bytes = f_in.read()
-                    
-                    # Call rembg.remove, explicitly setting the model_dir
-                    # Ensure the model (e.g., u2net.onnx) is present in self.models_dir
-                    output_bytes = remove(input_bytes, model_dir=str(self.models_dir), model_name="u2net")
-                    
-                    # Save the processed image to a new path
-                    processed_frame_path = temp_working_dir / f"processed_frame_{i:07d}.png"
-                    with open(processed_frame_path, 'wb') as f_out:
-                        f_out.write(output_bytes)
-                except Exception as e:
-                    self.logger.error(f"Error processing frame {frame_path}: {e}", exc_info=True)
-                    # If the rembg model is missing, this is where it might manifest.
-                    if "onnxruntime.capi.onnxruntime_pybind11_state.Fail" in str(e) or "No such file or directory" in str(e) or "ONNX model not found" in str(e):
-                        raise VideoBgRemoverError(f"Rembg model (u2net.onnx) might be missing or corrupted. Ensure it's downloaded in '{self.models_dir}'.")
-                    raise VideoBgRemoverError(f"Failed to process frame {frame_path}: {e}")
-
-            self.logger.info("All frames processed for background removal.")
-
-            # Step 3: Reassemble video from processed frames
-            self.logger.info("Reassembling video from processed frames...")
-            self._update_progress(85, "Reassembling video from frames...")
-
-            # Use MoviePy to create a clip from the image sequence
-            # MoviePy will use FFmpeg internally for this
-            processed_video_clip = VideoFileClip(str(temp_processed_frames_pattern), fps=25) # Match extraction FPS
+            with _FfmpegFramePipe(cmd_decode, (height, width, 4), writable=False) as decoder, \
+                 _FfmpegFramePipe(cmd_encode, (height, width, 4), writable=True) as encoder:
+                processed_frames = self._process_frames(decoder, encoder, total_frames)
 
-            # Set output video codec based on desired output extension
-            video_codec = "libvpx-vp9" # For WebM with alpha channel
-            pixel_format = "yuva420p" # For alpha channel support
+                decode_returncode, decode_stderr = decoder.close()
+                self._update_progress(95, "Finalizing video export...")
+                encode_returncode, encode_stderr = encoder.close()
 
-            if output_filepath.suffix.lower() == ".mov":
-                video_codec = "prores_ks" # ProRes 4444 (supports alpha), requires ffmpeg to be built with --enable-libopenh264 for libopenh264
-                pixel_format = "yuva444p10le" # For ProRes 4444
-            
-            # Combine video and audio
-            final_clip = processed_video_clip
-            if audio_clip:
-                self.logger.info("Attaching extracted audio to the video.")
-                final_clip = final_clip.set_audio(audio_clip)
-
-            self._update_progress(90, "Finalizing video export...")
-            final_clip.write_videofile(
-                str(output_filepath),
-                codec=video_codec,
-                audio_codec="aac", # AAC for audio is widely supported
-                pixel_format=pixel_format,
-                preset="medium", # or "ultrafast" for faster but larger files
-                threads=os.cpu_count(), # Utilize all available CPU cores
-                fps=25, # Match source FPS
-                logger="bar" # Show MoviePy's internal progress
-            )
+            # Encoder first: if it exited early, the decoder was stopped mid-stream because of it
+            if encode_returncode != 0:
+                self.logger.error(f"FFmpeg frame encoding failed. Exit code: {encode_returncode}. STDERR: {encode_stderr}")
+                raise VideoBgRemoverError(f"Failed to encode the processed video: {encode_stderr}")
+            if decode_returncode != 0:
+                self.logger.error(f"FFmpeg frame decoding failed. Exit code: {decode_returncode}. STDERR: {decode_stderr}")
+                raise VideoBgRemoverError(f"Failed to decode video frames: {decode_stderr}")
+            if processed_frames == 0:
+                raise VideoBgRemoverError("No frames found to process.")
+            self.logger.info(f"All {processed_frames} frames processed for background removal.")
 
             self._update_progress(100, "Video background removal complete!")
             self.logger.info(f"Video background removal completed successfully: {output_filepath}")
@@ -238,6 +427,10 @@ class VideoBgRemover:
             self._is_processing = False
             return True, f"Video background removal complete! Saved to: {output_filepath}"
 
+        except FileNotFoundError:
+            self._is_processing = False
+            self.logger.critical("FFmpeg executable not found. Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            return False, "FFmpeg not found. Please install it and add to PATH."
         except VideoBgRemoverError as e:
             self._is_processing = False
             self.logger.error(f"Video background removal failed: {e}", exc_info=True)
@@ -247,17 +440,8 @@ class VideoBgRemover:
             self.logger.critical(f"An unexpected critical error occurred during video background removal from '{input_filepath}': {e}", exc_info=True)
             return False, f"An unexpected error occurred during background removal: {e}"
         finally:
-            # Ensure MoviePy clips are closed
-            if video_clip:
-                video_clip.close()
-            if audio_clip:
-                audio_clip.close()
-            # Cleanup temporary directory (already handled by atexit, but explicit here for clarity)
-            if temp_working_dir.exists():
-                self.logger.info(f"Cleaning up temporary directory: {temp_working_dir}")
-                shutil.rmtree(temp_working_dir, ignore_errors=True)
             self._external_progress_callback = None # Clear callback to prevent stale references
 
     def is_processing(self) -> bool:
         """Returns True if a video background removal task is currently in progress, False otherwise."""
-        return self._is_processing
\ No newline at end of file
+        return self._is_processing
@@ -1,12 +1,13 @@
 import os
 import shutil
+import tempfile
 from pathlib import Path
-from moviepy import VideoFileClip
-# from moviepy.config import change_settings # Removed: This import is causing the ImportError
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
 import logging
-import subprocess # For creating dummy video in example usage
+import subprocess
+from typing import List, Optional, Tuple
+from src.utils.ffmpeg_tools import HARDWARE_H264_ENCODERS, X264_THREADS, get_ffmpeg_binary, get_ffprobe_binary, get_hardware_h264_encoder
 
 class VideoConverterError(Exception):
     """Custom exception for video conversion errors."""
@@ -22,29 +23,122 @@ class VideoConverter:
         self.config = get_application_config()
         self._is_converting = False # Internal state to track if a conversion is in progress
         self._external_progress_callback = None # To store the callback from the GUI
+        self._h264_encoder = None # Probed lazily from the FFmpeg build, see _get_hardware_h264_encoder
 
         # The FFmpeg binary path should be set as an environment variable (FFMPEG_BINARY)
-        # by the application's main entry point (main.py) before this module is imported.
-        # This ensures MoviePy finds the correct bundled FFmpeg executable.
-        self.logger.info("VideoConverter initialized. Assuming FFMPEG_BINARY environment variable is set.")
+        # by the application's main entry point (main.py) before this module is imported,
+        # so the bundled FFmpeg executable is used.
+        self.ffmpeg_binary = get_ffmpeg_binary()
+        self.ffprobe_binary = get_ffprobe_binary()
+        self.logger.info(f"VideoConverter initialized. Using FFmpeg binary: {self.ffmpeg_binary}, ffprobe binary: {self.ffprobe_binary}")
+
+    def _report_progress(self, progress_percentage: int, message: str):
+        """Passes a 0-100 progress value to the external progress callback, if any."""
+        if self._external_progress_callback:
+            # The actual GUI update needs to be scheduled on the main thread from the GUI page.
+            # This helper simply passes the value.
+            self._external_progress_callback(progress_percentage, message)
 
-    def _moviepy_progress_wrapper(self, current_time, total_duration):
+    def _probe_duration(self, input_filepath: Path) -> Optional[float]:
         """
-        Internal wrapper for MoviePy's progress_callback.
-        Converts MoviePy's time-based progress to a 0-100 integer percentage
-        and calls the external progress callback if available.
+        Returns the container duration in seconds via ffprobe, or None if it can't be read.
+        Raises VideoConverterError if the ffprobe executable itself cannot be found.
         """
-        if self._external_progress_callback:
-            if total_duration and total_duration > 0:
-                progress_percentage = int(min(max(0.0, current_time / total_duration), 1.0) * 100)
-            else:
-                progress_percentage = 0 # Or a small initial value if duration is unknown
-            
-            # The actual GUI update needs to be scheduled on the main thread from the GUI page.
-            # This wrapper simply calculates and passes the value.
-            self._external_progress_callback(progress_percentage, f"Converting: {progress_percentage}%")
-        self.logger.debug(f"MoviePy internal progress: {current_time:.2f}s / {total_duration:.2f}s")
+        cmd_probe = [
+            self.ffprobe_binary, "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            str(input_filepath)
+        ]
+        try:
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            process = subprocess.run(cmd_probe, check=True, capture_output=True, text=True, creationflags=creationflags)
+            return float(process.stdout.strip())
+        except FileNotFoundError:
+            self.logger.critical(f"ffprobe executable not found ({self.ffprobe_binary}). Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            raise VideoConverterError("ffprobe not found. Please install FFmpeg and add it to PATH.")
+        except (subprocess.CalledProcessError, ValueError) as e:
+            self.logger.warning(f"Could not read the duration of {input_filepath}: {e}")
+            return None
+
+    def _get_hardware_h264_encoder(self) -> Optional[str]:
+        """
+        Returns the hardware H.264 encoder to use (see get_hardware_h264_encoder), or None to use libx264.
+        The export falls back to libx264 if the hardware encode fails, and the encoder is then disabled for this instance.
+        """
+        if self._h264_encoder is None:
+            self._h264_encoder = get_hardware_h264_encoder(self.ffmpeg_binary) or ""
+        return self._h264_encoder or None
 
+    def _run_ffmpeg_encode(self, command: List[str], duration_secs: float, description: str) -> Tuple[bool, str]:
+        """
+        Runs one FFmpeg encode, reporting its -progress output as 20-99% conversion progress.
+        Returns (True, "Success") or (False, FFmpeg's error output).
+        """
+        self.logger.info(f"Executing FFmpeg command for {description}: {' '.join(command)}")
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        # stderr goes to a temp file: an undrained stderr pipe can fill up and stall FFmpeg
+        # while we are reading progress from stdout
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True, bufsize=1, creationflags=creationflags)
+            for line in process.stdout:
+                # -progress writes one key=value per line; out_time_us is the output position
+                key, _, value = line.strip().partition("=")
+                if key == "out_time_us":
+                    try:
+                        progress_percentage = 20 + int(min(max(0.0, int(value) / 1_000_000 / duration_secs), 1.0) * 79)
+                    except ValueError:
+                        continue # "N/A" before the first frame is written
+                    self._report_progress(progress_percentage, f"Converting: {progress_percentage}%")
+                elif key == "progress" and value == "end":
+                    break # End of progress
+            process.wait()
+            stderr_file.seek(0)
+            stderr_output = stderr_file.read().decode("utf-8", errors="replace")
+        if process.returncode != 0:
+            self.logger.error(f"FFmpeg command failed for {description}. Exit code: {process.returncode}. STDERR: {stderr_output}")
+            return False, stderr_output.strip()
+        self.logger.info(f"FFmpeg command for {description} completed successfully.")
+        return True, "Success"
+
+    def _transcode_to_mp4(self, input_filepath: Path, output_filepath: Path, duration_secs: float) -> Tuple[bool, str]:
+        """
+        Transcodes input_filepath to H.264/AAC MP4 in a single FFmpeg process, so decoded frames
+        never pass through Python. Uses the hardware encoder when one is available; if the hardware
+        encode fails, the encoder is disabled for this instance and libx264 is used.
+        """
+        input_args = [self.ffmpeg_binary, "-i", str(input_filepath), "-map", "0:v:0", "-map", "0:a:0?"]
+        # 4:2:0 plays everywhere; +faststart puts the moov atom first for streaming/upload
+        output_args = [
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+            "-c:a", "aac",
+            "-progress", "pipe:1", "-nostats",
+            "-y", str(output_filepath)
+        ]
+
+        hardware_encoder = self._get_hardware_h264_encoder()
+        if hardware_encoder:
+            self.logger.info(f"Exporting to MP4 (codec: {hardware_encoder}, audio_codec: aac) as: {output_filepath}")
+            cmd_hardware = [*input_args, "-c:v", hardware_encoder, *HARDWARE_H264_ENCODERS[hardware_encoder], *output_args]
+            success, msg = self._run_ffmpeg_encode(cmd_hardware, duration_secs, f"conversion ({hardware_encoder})")
+            if success:
+                return success, msg
+            self.logger.warning(f"{hardware_encoder} encoding failed. Falling back to libx264 software encoding.")
+            self._h264_encoder = ""
+
+        # libx264 is a highly efficient H.264 video encoder for MP4.
+        # aac is a common and good quality audio encoder for MP4.
+        x264_preset = self.config.get_setting("processing_parameters.video_conversion.x264_preset", "medium")
+        self.logger.info(f"Exporting to MP4 (codec: libx264, preset: {x264_preset}, audio_codec: aac) as: {output_filepath}")
+        cmd_x264 = [
+            *input_args,
+            "-c:v", "libx264",
+            "-preset", x264_preset, # Adjust for speed vs. quality: "ultrafast", "superfast", "veryfast", "faster", "fast", "medium", ...
+            "-crf", "23",
+            "-threads", str(X264_THREADS), # More threads than physical cores only adds contention in x264
+            *output_args
+        ]
+        return self._run_ffmpeg_encode(cmd_x264, duration_secs, "conversion (libx264)")
 
     def convert_video_to_mp4(self, input_filepath: Path, output_filepath: Path, delete_original: bool = False, progress_callback_func=None):
         """
@@ -86,49 +180,25 @@ class VideoConverter:
             self.logger.warning(f"Output file extension changed from '{output_filepath.suffix}' to '.mp4'")
             output_filepath = output_filepath.with_suffix(".mp4")
 
-        clip = None # Initialize clip to None
         try:
-            self.logger.info(f"Trying to load video clip from: {input_filepath}")
-            self._external_progress_callback(10, "Loading video clip...")
-            try:
-                # MoviePy implicitly uses the FFMPEG_BINARY environment variable set in main.py
-                clip = VideoFileClip(str(input_filepath))
-                self.logger.debug(f"Successfully loaded clip. Duration: {clip.duration}s, FPS: {clip.fps}, Size: {clip.size}")
-            except Exception as e:
-                self.logger.error(f"Failed to load video clip from {input_filepath}: {e}", exc_info=True)
-                self._is_converting = False
-                return False, f"Failed to load video: {e}. Please ensure the file is a valid video and FFmpeg is correctly installed and accessible via the 'FFMPEG_BINARY' environment variable."
+            self.logger.info(f"Reading video duration from: {input_filepath}")
+            self._external_progress_callback(10, "Reading video...")
+            duration_secs = self._probe_duration(input_filepath)
 
-            if clip.duration is None or clip.duration <= 0:
-                self.logger.warning(f"Clip duration is zero or unknown for {input_filepath}. This often indicates a corrupt or invalid video file.")
+            if duration_secs is None or duration_secs <= 0:
+                self.logger.warning(f"Video duration is zero or unknown for {input_filepath}. This often indicates a corrupt or invalid video file.")
                 if self._external_progress_callback:
                     self._external_progress_callback(0, "Error: Invalid video file.")
                 
                 error_message = f"Video duration is zero or invalid for '{input_filepath}'. This typically means the video file is corrupted or not a recognized format for FFmpeg. Please try with a different video file."
-                
-                if clip is not None: # Ensure clip is closed if it was partially created
-                    clip.close()
                 self._is_converting = False
                 return False, error_message
+            self.logger.debug(f"Video duration: {duration_secs:.2f}s")
 
-            # Perform the conversion. We specify codecs for broad compatibility and good quality.
-            # libx264 is a highly efficient H.264 video encoder for MP4.
-            # aac is a common and good quality audio encoder for MP4.
-            self.logger.info(f"Exporting to MP4 (codec: libx264, audio_codec: aac) as: {output_filepath}")
             self._external_progress_callback(20, "Starting video encoding...")
-            
-            # Pass our internal wrapper to MoviePy's progress_callback
-            clip.write_videofile(
-                str(output_filepath),
-                codec="libx264",
-                audio_codec="aac",
-                logger="bar",       # Show MoviePy's internal progress bar in console (useful for dev)
-                progress_callback=self._moviepy_progress_wrapper,
-                preset="medium",     # Adjust for speed vs. quality: "ultrafast", "superfast", "fast", "medium" (default), "slow", "slower", "veryslow")
-                threads=os.cpu_count() # Utilize all available CPU cores for FFmpeg encoding
-            )
-            
-            # Note: clip.close() moved to finally block for guaranteed resource release.
+            success, msg = self._transcode_to_mp4(input_filepath, output_filepath, duration_secs)
+            if not success:
+                raise VideoConverterError(f"FFmpeg conversion failed: {msg}")
 
             # Ensure final progress update
             if self._external_progress_callback:
@@ -160,11 +230,6 @@ class VideoConverter:
             
             return False, f"Conversion failed: {e}"
         finally:
-            if clip is not None:
-                try:
-                    clip.close()
-                except Exception as e:
-                    self.logger.error(f"Error closing video clip in finally block: {e}")
             self._external_progress_callback = None # Clear callback to prevent stale references
 
     def is_converting(self) -> bool:
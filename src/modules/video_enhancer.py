@@ -3,14 +3,16 @@ import subprocess
 from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 import os
+import shutil
+import tempfile
 import numpy as np
 import cv2 # For potential frame analysis or pre-processing if needed
 
-from moviepy import VideoFileClip
 # from moviepy.config import change_settings # Uncomment if ffmpeg path needs explicit setting
 
 from src.core.logger import get_application_logger
 from src.core.config_manager import get_application_config
+from src.utils.ffmpeg_tools import get_ffmpeg_binary, get_ffprobe_binary
 
 class VideoEnhancerError(Exception):
     """Custom exception for video enhancement errors."""
@@ -28,7 +30,11 @@ class VideoEnhancer:
         self._is_processing = False # Internal state to track if a conversion is in progress
         self._external_progress_callback = None # To store the callback from the GUI
 
-        self.logger.info("VideoEnhancer initialized.")
+        # Bundled/configured FFmpeg binaries (FFMPEG_BINARY, set by main.py), with PATH as the fallback
+        self.ffmpeg_binary = get_ffmpeg_binary()
+        self.ffprobe_binary = get_ffprobe_binary()
+
+        self.logger.info(f"VideoEnhancer initialized. Using FFmpeg binary: {self.ffmpeg_binary}, ffprobe binary: {self.ffprobe_binary}")
 
     def _update_progress(self, progress_percentage: int, message: str, level: str = "info"):
         """
@@ -41,7 +47,7 @@ class VideoEnhancer:
         self.logger.log(getattr(logging, level.upper()), f"VIDEO_ENHANCE_PROGRESS: {message} ({progress_percentage}%)")
 
 
-    def _build_ffmpeg_filter_string(self, enhancement_params: Dict[str, Any]) -> str:
+    def build_ffmpeg_filter_string(self, enhancement_params: Dict[str, Any]) -> str:
         """
         Builds a complex FFmpeg filter string based on provided enhancement parameters.
         Parameters are typically loaded from config_manager.
@@ -113,6 +119,28 @@ class VideoEnhancer:
 
         return ",".join(filters) if filters else ""
 
+    def _probe_duration(self, input_filepath: Path) -> Optional[float]:
+        """
+        Returns the container duration in seconds via ffprobe, or None if it can't be read.
+        Raises VideoEnhancerError if the ffprobe executable itself cannot be found.
+        """
+        cmd_probe = [
+            self.ffprobe_binary, "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            str(input_filepath)
+        ]
+        try:
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            process = subprocess.run(cmd_probe, check=True, capture_output=True, text=True, creationflags=creationflags)
+            return float(process.stdout.strip())
+        except FileNotFoundError:
+            self.logger.critical(f"ffprobe executable not found ({self.ffprobe_binary}). Please ensure FFmpeg is installed and in your system's PATH, or correctly configured.")
+            raise VideoEnhancerError("ffprobe not found. Please install FFmpeg and add it to PATH.")
+        except (subprocess.CalledProcessError, ValueError) as e:
+            self.logger.warning(f"Could not read the duration of {input_filepath}; progress will not be reported: {e}")
+            return None
+
     def enhance_video(
         self, 
         input_filepath: Path, 
@@ -149,7 +177,7 @@ class VideoEnhancer:
             output_filepath.parent.mkdir(parents=True, exist_ok=True) # Ensure output directory exists
 
             # Build the FFmpeg filter string
-            filter_string = self._build_ffmpeg_filter_string(enhancement_params)
+            filter_string = self.build_ffmpeg_filter_string(enhancement_params)
             
             if not filter_string:
                 self.logger.info("No enhancement filters specified. Copying input video to output.")
@@ -160,26 +188,11 @@ class VideoEnhancer:
 
             self._update_progress(10, f"Applying filters: {filter_string}")
 
-            # MoviePy uses FFmpeg under the hood. Using VideoFileClip.write_videofile
-            # directly is often the most straightforward way to apply filters.
-            
-            clip = VideoFileClip(str(input_filepath))
-
-            # Apply video filters. MoviePy's internal `fl_image` is typically for frame-by-frame
-            # custom Python processing. For FFmpeg filters, it's more direct to pass them
-            # to `ffmpeg_options` or rely on MoviePy's `fx` methods if available.
-            # However, for complex filter chains like those built here, using direct `ffmpeg_params`
-            # during write_videofile is most robust.
-            
-            # Temporary output path for MoviePy's internal processing if it creates one
-            temp_output = output_filepath.with_suffix(".temp.mp4")
-
             self._update_progress(20, "Encoding video with enhancements...")
 
-            # FFmpeg command to apply filters (more robust than MoviePy's fx for complex chains)
-            # This method directly calls subprocess, bypassing some MoviePy overhead for filters.
+            # All filters run in one FFmpeg pass over the whole video; no frame goes through Python.
             command = [
-                "ffmpeg",
+                self.ffmpeg_binary,
                 "-i", str(input_filepath),
                 "-vf", filter_string, # Video filtergraph
                 "-c:v", "libx264",    # Video codec (H.264)
@@ -188,35 +201,39 @@ class VideoEnhancer:
                 "-c:a", "copy",       # Copy audio stream without re-encoding
                 "-y",                 # Overwrite output file without asking
                 "-progress", "pipe:1", # Enable progress reporting to stdout
+                "-nostats",
                 str(output_filepath)
             ]
 
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, universal_newlines=True, creationflags=subprocess.CREATE_NO_WINDOW)
-
-            duration_secs = None
-            if clip.duration:
-                duration_secs = clip.duration
+            # Duration from ffprobe for the progress percentage; no MoviePy reader is opened for it
+            duration_secs = self._probe_duration(input_filepath)
+            if duration_secs:
                 self.logger.debug(f"Video duration detected: {duration_secs:.2f} seconds.")
 
-            for line in process.stdout:
-                if "frame=" in line and "time=" in line and duration_secs:
-                    try:
-                        # Extract time (HH:MM:SS.ms)
-                        time_str_match = next((s for s in line.split() if s.startswith("time=")), None)
-                        if time_str_match:
-                            time_parts = list(map(float, time_str_match.split("=")[1].split(':')))
-                            current_time_secs = time_parts[0] * 3600 + time_parts[1] * 60 + time_parts[2]
-                            percentage = int((current_time_secs / duration_secs) * 100)
+            creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            # stderr goes to a temp file: an undrained stderr pipe can fill up and stall FFmpeg
+            # while we are reading progress from stdout
+            with tempfile.TemporaryFile() as stderr_file:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True, bufsize=1, universal_newlines=True, creationflags=creationflags)
+
+                for line in process.stdout:
+                    # -progress writes one key=value per line; out_time_us is the output position
+                    key, _, value = line.strip().partition("=")
+                    if key == "out_time_us" and duration_secs:
+                        try:
+                            current_time_secs = int(value) / 1_000_000
+                            percentage = 20 + int((current_time_secs / duration_secs) * 79)
                             self._update_progress(percentage, "Applying enhancements...")
-                    except Exception as prog_e:
-                        self.logger.debug(f"Error parsing FFmpeg progress line: {line.strip()} - {prog_e}")
-                elif "progress=end" in line:
-                    break # End of progress
-
-            process.wait() # Wait for the process to finish
+                        except ValueError:
+                            self.logger.debug(f"Error parsing FFmpeg progress line: {line.strip()}")
+                    elif key == "progress" and value == "end":
+                        break # End of progress
+
+                process.wait() # Wait for the process to finish
+                stderr_file.seek(0)
+                stderr_output = stderr_file.read().decode("utf-8", errors="replace")
             
             if process.returncode != 0:
-                stderr_output = process.stderr.read()
                 self.logger.error(f"FFmpeg enhancement failed with error: {stderr_output}", exc_info=True)
                 raise VideoEnhancerError(f"FFmpeg enhancement failed: {stderr_output.strip()}")
 
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import functools
+from pathlib import Path
+from typing import Optional
+import psutil # Physical core count for the x264 thread setting
+
+from src.core.logger import get_application_logger
+
+# Hardware H.264 encoders in order of preference, with their rate control for social media quality.
+# h264_vaapi is left out: it needs a device and an hwupload stage in the filtergraph.
+HARDWARE_H264_ENCODERS = {
+    "h264_nvenc": ["-preset", "p4", "-rc", "vbr", "-cq", "23"],
+    "h264_qsv": ["-global_quality", "23"],
+    "h264_videotoolbox": ["-b:v", "5M"],
+}
+
+# libx264 threads: one per physical core, since SMT siblings contend for the same execution units,
+# capped at 16 where x264's frame threading stops scaling
+X264_THREADS = min(psutil.cpu_count(logical=False) or os.cpu_count() or 1, 16)
+
+def get_ffmpeg_binary() -> str:
+    """
+    Returns the FFmpeg executable to run. main.py sets FFMPEG_BINARY to the bundled or configured
+    binary at startup; without it, "ffmpeg" is looked up on PATH.
+    """
+    return os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+def get_ffprobe_binary() -> str:
+    """
+    Returns the ffprobe executable to run. ffprobe ships alongside ffmpeg, so the one next to
+    get_ffmpeg_binary() is used when it exists; otherwise "ffprobe" is looked up on PATH.
+    """
+    ffmpeg_path = Path(get_ffmpeg_binary())
+    ffprobe_path = ffmpeg_path.with_name(f"ffprobe{ffmpeg_path.suffix}")
+    if ffmpeg_path.parent != Path(".") and ffprobe_path.is_file():
+        return str(ffprobe_path)
+    return "ffprobe"
+
+@functools.lru_cache(maxsize=8)
+def get_hardware_h264_encoder(ffmpeg_binary: str) -> Optional[str]:
+    """
+    Returns the preferred hardware H.264 encoder exposed by the given FFmpeg build (see
+    HARDWARE_H264_ENCODERS), or None to use libx264. The build is probed once per binary.
+    Having an encoder compiled in does not guarantee usable hardware, so callers still fall back
+    to libx264 if a hardware encode fails.
+    """
+    logger = get_application_logger()
+    encoder = None
+    try:
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        result = subprocess.run([ffmpeg_binary, "-hide_banner", "-encoders"], capture_output=True, text=True, encoding='utf-8', creationflags=creationflags)
+        encoder = next((name for name in HARDWARE_H264_ENCODERS if name in result.stdout), None)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not probe FFmpeg encoders: {e}")
+    logger.info(f"Hardware H.264 encoder: {encoder or 'none, using libx264'}")
+    return encoder